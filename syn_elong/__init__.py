@@ -1,17 +1,52 @@
-import cobra
 import pathlib
-import pandas as pd
 
 
 path = pathlib.Path(__file__).parent
 
-model = cobra.io.read_sbml_model(
-    path.joinpath('syn_elong.xml').__str__()
-)
-ijb792 = cobra.io.load_json_model(path.joinpath('iJB792.json').__str__())
-ims837 =cobra.io.load_json_model(path.joinpath('iMS837.json').__str__())
-
 exp_file_path = path.joinpath('data', 'experiments.yml').__str__()
-expected_metab = pd.read_csv(
-    path.joinpath('data', 'excreted', 'metabolites.csv').__str__(),
-).bigg_id
\ No newline at end of file
+
+
+def _load_model():
+    import cobra
+    from syn_elong.cache import cached_model
+    return cached_model(path.joinpath('syn_elong.xml'), cobra.io.read_sbml_model)
+
+
+def _load_ijb792():
+    import cobra
+    from syn_elong.cache import cached_model
+    return cached_model(path.joinpath('iJB792.json'), cobra.io.load_json_model)
+
+
+def _load_ims837():
+    import cobra
+    from syn_elong.cache import cached_model
+    return cached_model(path.joinpath('iMS837.json'), cobra.io.load_json_model)
+
+
+def _load_expected_metab():
+    import pandas as pd
+    return pd.read_csv(
+        path.joinpath('data', 'excreted', 'metabolites.csv').__str__(),
+    ).bigg_id
+
+
+# module attributes that are only loaded on first access
+_lazy_attributes = {
+    'model': _load_model,
+    'ijb792': _load_ijb792,
+    'ims837': _load_ims837,
+    'expected_metab': _load_expected_metab,
+}
+
+
+def __getattr__(name):
+    if name not in _lazy_attributes:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = _lazy_attributes[name]()
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy_attributes))
@@ -0,0 +1,196 @@
+"""
+Strain designs for many target products on one shared preprocessing.
+
+A StrainDesign per product repeats the blocked/irreversible FVA, the GPR
+extension and the network compression, although none of them depends on the
+product. BatchStrainDesign preprocesses once with the modules of all products
+(so the compression protects every target exchange) and takes essential
+reactions only from the modules shared by all products, or from the model
+without any module constraints. Each product then gets its own essential
+reactions from an FVA of the compressed model under its modules, and the
+per-product MILPs are solved in parallel.
+
+    python -m syn_elong.batch_strain_design 4
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from straindesign import SDModule, SDPool
+from straindesign.names import CONSTRAINTS, KICOST, KOCOST, MODULE_TYPE, OPTCOUPLE, SUPPRESS, ANY
+
+from syn_elong import cache
+from syn_elong.strain_design_simplified import StrainDesign
+
+
+class BatchStrainDesign(StrainDesign):
+    def __init__(self, model, product_modules, shared_modules=None, **kwargs):
+        """
+        Preprocesses the strain design problems of several products together.
+
+        product_modules (dict):
+            Strain design module(s) of each product, e.g. an OptCouple module with the product exchange as prod_id.
+
+        shared_modules (optional (list of SDModule)): (Default: None)
+            Modules that are part of every product's problem, e.g. a PROTECT module for growth.
+
+        All other arguments are the same as for StrainDesign.
+        """
+        shared_modules = [] if shared_modules is None else list(shared_modules)
+        self.products = list(product_modules)
+        self.num_shared_modules = len(shared_modules)
+        # position of each product's modules in sd_modules, which keeps its order through GPR extension and
+        # compression
+        self.product_slices = {}
+        sd_modules = list(shared_modules)
+        for product, modules in product_modules.items():
+            if isinstance(modules, SDModule):
+                modules = [modules]
+            self.product_slices[product] = (len(sd_modules), len(sd_modules) + len(modules))
+            sd_modules.extend(modules)
+        super().__init__(model, sd_modules, **kwargs)
+
+    def preprocessing_key(self):
+        # the shared essential reactions differ from those of a StrainDesign with the same modules
+        return cache.text_hash(super().preprocessing_key(), self.num_shared_modules, cache.file_hash(__file__))
+
+    def essentiality_constraints(self):
+        """ Constraints that hold in every product's problem, so their essential reactions are shared. """
+        shared = self.sd_modules[:self.num_shared_modules]
+        constraint_sets = [m[CONSTRAINTS] for m in shared if m[MODULE_TYPE] != SUPPRESS]
+        if constraint_sets:
+            return constraint_sets
+        # module constraints only shrink the flux space, so reactions essential in the plain model are essential
+        # under every desired module. With only SUPPRESS modules a lethal knockout is a valid design.
+        if all(self.product_constraints(p) for p in self.products):
+            return [[]]
+        return []
+
+    def product_constraints(self, product):
+        start, stop = self.product_slices[product]
+        return [m[CONSTRAINTS] for m in self.sd_modules[start:stop] if m[MODULE_TYPE] != SUPPRESS]
+
+    def product_problem(self, product):
+        """ StrainDesign of a single product on the shared preprocessing, with its own essential reactions. """
+        start, stop = self.product_slices[product]
+        constraint_sets = self.product_constraints(product)
+        # the shared essential reactions are essential for this product too, they are not solved again
+        known = {reac_id: 1 for reac_id in self.compressed_essential_reactions}
+        essential_reacs, _ = self.compressed_essentials(constraint_sets, [known] * len(constraint_sets))
+        logging.info(f'  {product}: {len(essential_reacs - self.compressed_essential_reactions)} '
+                     f'product specific essential reactions.')
+
+        state = self.preprocessed_state()
+        problem = StrainDesign.from_state(state)
+        problem.sd_modules = self.sd_modules[:self.num_shared_modules] + self.sd_modules[start:stop]
+        problem.orig_sd_modules = self.orig_sd_modules[:self.num_shared_modules] + self.orig_sd_modules[start:stop]
+        problem.compressed_ko_cost = {k: v for k, v in self.compressed_ko_cost.items() if k not in essential_reacs}
+        problem.essential_kis = self.essential_kis | set(
+            self.compressed_ki_cost[er] for er in essential_reacs if er in self.compressed_ki_cost
+        )
+        problem.kwargs_milp = dict(self.kwargs_milp)
+        problem.kwargs_milp.update({
+            KOCOST: problem.compressed_ko_cost,
+            'essential_kis': problem.essential_kis,
+        })
+        return problem
+
+    def run(self, *args, **kwargs):
+        raise Exception('A BatchStrainDesign holds several problems, use run_products().')
+
+    def run_products(self, products=None, processes=None, max_solutions=5, time_limit=60, max_cost=np.inf,
+                     solution_approach=ANY):
+        """
+        Solves the MILP of each product and collects the strain designs in one table.
+
+        products (optional (list)): (Default: all products)
+
+        processes (optional (int)): (Default: None)
+            Number of worker processes for the MILPs. If None, the products are solved one after the other in
+            this process.
+
+        Other arguments are the same as for StrainDesign.run.
+
+        Returns a pandas.DataFrame with one row per strain design (and one row without a design for products that
+        have none): product, MILP status, strain design, its cost and the time the product's MILP took.
+        """
+        if products is None:
+            products = self.products
+        run_kwargs = {
+            'max_solutions': max_solutions,
+            'time_limit': time_limit,
+            'max_cost': max_cost,
+            'solution_approach': solution_approach,
+        }
+        rows = []
+        with tempfile.TemporaryDirectory() as tmp:
+            tasks = []
+            for product in products:
+                state_path = os.path.join(tmp, f'{len(tasks)}.pkl')
+                cache.dump(self.product_problem(product).preprocessed_state(), state_path)
+                tasks.append((product, state_path, run_kwargs))
+            if processes is None:
+                solved = map(_run_product, tasks)
+                rows = [row for result in solved for row in _result_rows(*result)]
+            else:
+                with SDPool(processes) as pool:
+                    for result in pool.imap_unordered(_run_product, tasks):
+                        rows.extend(_result_rows(*result))
+        table = pd.DataFrame(rows, columns=['product', 'status', 'strain_design', 'cost', 'time'])
+        order = {product: i for i, product in enumerate(products)}
+        return table.sort_values('product', key=lambda c: c.map(order), kind='stable').reset_index(drop=True)
+
+
+def _run_product(task):
+    product, state_path, run_kwargs = task
+    start = time.perf_counter()
+    sd_solutions = StrainDesign.from_state(cache.load(state_path)).run(**run_kwargs)
+    return product, sd_solutions, time.perf_counter() - start
+
+
+def _result_rows(product, sd_solutions, elapsed):
+    if not sd_solutions.reaction_sd:
+        return [(product, sd_solutions.status, None, None, elapsed)]
+    return [
+        (product, sd_solutions.status, design, cost, elapsed)
+        for design, cost in zip(sd_solutions.reaction_sd, sd_solutions.sd_cost)
+    ]
+
+
+def optcouple_modules(model, metabolites, biomass='BIOMASS__1', min_gcp=0.1):
+    """
+    OptCouple module per product, for the metabolites (bigg ids) that have an exchange reaction in the model.
+
+    Returns
+    -------
+    dict
+        {exchange reaction id: SDModule}
+    """
+    product_modules = {}
+    for bigg_id in metabolites:
+        prod_id = f'EX_{bigg_id}_e'
+        if not model.reactions.has_id(prod_id):
+            logging.warning(f'No exchange reaction {prod_id}, skipping {bigg_id}.')
+            continue
+        product_modules[prod_id] = SDModule(model, OPTCOUPLE, inner_objective=biomass, prod_id=prod_id,
+                                            min_gcp=min_gcp)
+    return product_modules
+
+
+if __name__ == '__main__':
+    from syn_elong import expected_metab
+    from syn_elong.benchmarks.sucrose_setup import sucrose_problem
+
+    logging.basicConfig(level=logging.INFO)
+    consistent_model, _, rxn_cost = sucrose_problem()
+    modules = optcouple_modules(consistent_model, expected_metab)
+    for prod_id in modules:
+        # products are not taken up
+        consistent_model.reactions.get_by_id(prod_id).lower_bound = 0
+    batch = BatchStrainDesign(consistent_model, modules, ko_cost=rxn_cost)
+    results = batch.run_products(processes=int(sys.argv[1]) if len(sys.argv) > 1 else None, max_cost=5)
+    print(results.to_string())
@@ -0,0 +1,164 @@
+"""
+straindesign's compress_model against syn_elong.sparse_compression.
+
+Prepares the consistent model of the sucrose problem as StrainDesign does
+before compressing (dummy bounds removed, bounds from the blocked/irreversible
+FVA), then compresses a copy with each engine and prints the time, the number
+of compression steps and the size of the compressed network.
+
+With --verify, the FVA ranges of every compressed network are mapped back to
+the uncompressed reactions and compared with the FVA of the uncompressed
+model, and StrainDesign is run on the sucrose problem with both engines to
+compare the decompressed strain designs (expand_sd). Reactions that end up in
+a parallel lump have no range of their own and are only counted. Without
+syn_elong.xml, the iMS837 stand-in of sucrose_setup is used.
+
+    python -m syn_elong.benchmarks.bench_compression --verify
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+from cobra.util.array import create_stoichiometric_matrix
+from scipy.optimize import linprog
+from straindesign.networktools import bound_blocked_or_irrevers_fva, compress_model, remove_dummy_bounds
+
+from syn_elong import path
+from syn_elong.benchmarks.sucrose_setup import ims837_sucrose_model, sucrose_problem
+from syn_elong.sparse_compression import compress_model_sparse
+
+engines = {
+    'straindesign': compress_model,
+    'sparse': compress_model_sparse,
+}
+
+# StrainDesign's compress argument of each engine
+sd_compress = {
+    'straindesign': True,
+    'sparse': 'sparse',
+}
+
+tolerance = 1e-6
+
+# bound of the optimized reaction in fva_ranges, far above the fluxes of the bounded reactions
+flux_cap = 1e4
+
+
+def fva_ranges(model):
+    """
+    {reaction id: (min, max)} of all reactions, unbounded ones are infinite.
+
+    Solved with HiGHS through scipy, independent of straindesign (whose fva compresses the network itself) and of
+    the solvers, which do not all report unbounded LPs once remove_dummy_bounds made the bounds infinite. HiGHS
+    returns arbitrary large fluxes for some of these too, so the optimized reaction is bounded by flux_cap and a
+    range that reaches it is taken as unbounded.
+    """
+    stoich = create_stoichiometric_matrix(model, array_type='dok').tocsr()
+    bounds = [(max(float(r.lower_bound), -flux_cap), min(float(r.upper_bound), flux_cap)) for r in model.reactions]
+    free = [(None if np.isinf(float(r.lower_bound)) else float(r.lower_bound),
+             None if np.isinf(float(r.upper_bound)) else float(r.upper_bound)) for r in model.reactions]
+    ranges = {}
+    for i, r in enumerate(model.reactions):
+        limits = []
+        for sign in [1, -1]:
+            c = np.zeros(len(model.reactions))
+            c[i] = sign
+            result = linprog(c, A_eq=stoich, b_eq=np.zeros(stoich.shape[0]),
+                             bounds=free[:i] + [bounds[i]] + free[i + 1:], method='highs')
+            value = sign * result.fun if result.success else np.nan
+            limits.append(-sign * np.inf if abs(value) >= flux_cap * (1 - tolerance) else value)
+        ranges[r.id] = tuple(limits)
+    return ranges
+
+
+def expand_ranges(ranges, cmp_map_reac):
+    """
+    Ranges of the uncompressed reactions from those of the compressed network.
+
+    Every step maps a lumped reaction to its members with factors, a member of a coupled lump carries factor times
+    the lumped flux. Members of parallel lumps get None, reactions the compression removed (0, 0).
+    """
+    for cmp in reversed(cmp_map_reac):
+        expanded = {}
+        for new_reac, old_reacs in cmp['reac_map_exp'].items():
+            for old_reac, factor in old_reacs.items():
+                lumped = ranges.get(new_reac)
+                if lumped is None or cmp['parallel'] and len(old_reacs) > 1:
+                    expanded[old_reac] = None
+                else:
+                    bounds = [float(factor) * v for v in lumped]
+                    expanded[old_reac] = (min(bounds), max(bounds))
+        ranges = expanded
+    return ranges
+
+
+def compare_ranges(reference, ranges):
+    """ Number of compared reactions, ids of reactions with a different range and number in parallel lumps. """
+    differing = []
+    parallel = 0
+    for reac_id, (lo, hi) in reference.items():
+        expanded = ranges.get(reac_id, (0.0, 0.0))
+        if expanded is None:
+            parallel += 1
+        elif not np.allclose([lo, hi], expanded, atol=tolerance):
+            differing.append(reac_id)
+    return len(reference) - parallel, differing, parallel
+
+
+def design_sets(consistent_model, modules, ko_cost, compress, solver=None, M=None, max_cost=3, max_solutions=50,
+                time_limit=300):
+    """ Decompressed OptCouple designs (sets of knocked out reactions) of StrainDesign with one engine. """
+    from straindesign.names import BEST
+    from syn_elong.strain_design_simplified import StrainDesign
+    strain_design = StrainDesign(consistent_model, sd_modules=[modules['optcouple']], solver=solver, M=M,
+                                 ko_cost=ko_cost, compress=compress)
+    solution = strain_design.run(max_solutions=max_solutions, time_limit=time_limit, max_cost=max_cost,
+                                 solution_approach=BEST)
+    designs = {frozenset(k for k, v in s.items() if v) for s in solution.reaction_sd}
+    return solution.status, designs
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Compare the compression engines on the sucrose problem.')
+    parser.add_argument('--verify', action='store_true',
+                        help='compare the decompressed FVA ranges and strain designs of the engines')
+    parser.add_argument('--solver', help='LP / MILP solver, straindesign\'s default if not given')
+    parser.add_argument('--M', type=float, help='big M of the MILP, indicator constraints if not given')
+    args = parser.parse_args(args)
+    model = None if os.path.exists(path.joinpath('syn_elong.xml')) else ims837_sucrose_model()
+    consistent_model, modules, ko_cost = sucrose_problem(model)
+    prepared = consistent_model.copy()
+    remove_dummy_bounds(prepared)
+    bound_blocked_or_irrevers_fva(prepared, solver=args.solver)
+    protected = {'BIOMASS__1', 'EX_sucr_e'}
+    reference = fva_ranges(prepared) if args.verify else None
+    failed = False
+    print(f"{'engine':<14}{'time (s)':>10}{'steps':>7}{'reactions':>11}{'metabolites':>13}")
+    for label, engine in engines.items():
+        model = prepared.copy()
+        start = time.perf_counter()
+        cmp_map_reac = engine(model, set(protected))
+        elapsed = time.perf_counter() - start
+        print(f"{label:<14}{elapsed:>10.2f}{len(cmp_map_reac):>7}{len(model.reactions):>11}"
+              f"{len(model.metabolites):>13}")
+        if args.verify:
+            ranges = expand_ranges(fva_ranges(model), cmp_map_reac)
+            compared, differing, parallel = compare_ranges(reference, ranges)
+            print(f'  FVA ranges: {compared} reactions compared, {len(differing)} differ, {parallel} in parallel '
+                  f'lumps {differing[:10]}')
+            failed = failed or bool(differing)
+    if args.verify:
+        results = {label: design_sets(consistent_model, modules, ko_cost, compress, args.solver, args.M)
+                   for label, compress in sd_compress.items()}
+        for label, (status, designs) in results.items():
+            print(f'  {label}: {status}, {len(designs)} strain designs')
+        (_, reference_designs), (_, sparse_designs) = results['straindesign'], results['sparse']
+        print(f'  designs only with straindesign: {sorted(map(sorted, reference_designs - sparse_designs))}')
+        print(f'  designs only with sparse: {sorted(map(sorted, sparse_designs - reference_designs))}')
+        failed = failed or reference_designs != sparse_designs
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,74 @@
+"""
+Single gene essentiality of the knock-out library: cobra against syn_elong.essentiality.
+
+Times cobra's single_gene_deletion on one process (what memote's essentiality
+experiment runs) against single_gene_essentiality in-process and on a pool,
+on the syn_elong model with the medium of the experiment, and checks that all
+three call the same genes essential. Then times IncrementalEssentiality on
+the model and again after the reactions of update_3 in model_changes.py are
+added, against a full evaluation of the edited model.
+
+    python -m syn_elong.benchmarks.bench_essentiality
+"""
+import math
+import os
+import time
+
+from cobra.flux_analysis import single_gene_deletion
+
+from syn_elong import essentiality
+from syn_elong.universal_store import universal_store
+
+
+def main():
+    from syn_elong import model
+
+    data, medium, minimal_growth_rate = essentiality.load_experiment()
+    genes = list(data['gene'])
+    if minimal_growth_rate is None:
+        minimal_growth_rate = model.slim_optimize() * essentiality.default_threshold
+    groups = essentiality.group_by_disabled_reactions(model, genes)
+    print(f'{len(genes)} genes, {len([s for s in groups if s])} distinct disabled reaction sets')
+
+    with model:
+        model.medium = medium
+        start = time.perf_counter()
+        deletions = single_gene_deletion(model, gene_list=genes, processes=1)
+        elapsed = time.perf_counter() - start
+        deletions['gene'] = [list(g)[0] for g in deletions['ids']]
+        deletions = deletions.set_index('gene')
+        reference = (deletions['growth'] < minimal_growth_rate) | deletions['growth'].isna()
+        print(f"{'cobra, 1 process':<24}{elapsed:>10.2f} s")
+        for label, processes in [('grouped, in-process', None), (f'grouped, {os.cpu_count()} processes',
+                                                                 os.cpu_count())]:
+            start = time.perf_counter()
+            table = essentiality.single_gene_essentiality(model, genes, minimal_growth_rate, processes)
+            elapsed = time.perf_counter() - start
+            differ = [g for g in genes if bool(table.loc[g, 'essential']) != bool(reference[g])]
+            print(f'{label:<24}{elapsed:>10.2f} s, {len(differ)} genes differ from cobra')
+            growth_differ = [
+                g for g in genes
+                if not math.isclose(table.loc[g, 'growth'], deletions.loc[g, 'growth'], abs_tol=1e-6)
+                and not (math.isnan(table.loc[g, 'growth']) and math.isnan(deletions.loc[g, 'growth']))
+            ]
+            print(f"{'':<24}{len(growth_differ)} growth rates differ from cobra")
+
+    incremental = essentiality.IncrementalEssentiality()
+    with model:
+        for label in ['incremental, first run', 'incremental, edited']:
+            start = time.perf_counter()
+            tables = incremental.evaluate(model)
+            elapsed = time.perf_counter() - start
+            print(f'{label:<24}{elapsed:>10.2f} s, {incremental.last_run}')
+            rxns = ['MPTSS', 'MOADSUx', 'GTPC', 'CPMPS', 'MPTS', 'MPTAT', 'MOCOS', 'MDH']
+            model.add_reactions(universal_store().get_reactions([r for r in rxns if not model.reactions.has_id(r)]))
+        start = time.perf_counter()
+        full = essentiality.confusion_tables(model)
+        elapsed = time.perf_counter() - start
+        print(f"{'full, edited':<24}{elapsed:>10.2f} s")
+        differ = [k for k in full if sorted(full[k].index) != sorted(tables[k].index)]
+        print(f"{'':<24}confusion tables that differ from the incremental ones: {differ}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Excretion check of the expected metabolites: concerto against syn_elong.excretion.
+
+Times concerto's get_excreted_metabolites (one model setup and optimization per
+exchange reaction) against excreted_metabolites in-process and on a pool, on
+the syn_elong model, and checks that all give the same TP / FN sets.
+
+syn_elong.xml is built by model_changes.py with concerto's biolog exchanges and
+is not checked in. Without it (or without concerto), the reference is one fresh
+optimization per exchange reaction, as get_excreted_metabolites does, on iMS837
+with an exchange reaction for every expected metabolite it has in the cytosol.
+
+    python -m syn_elong.benchmarks.bench_excretion
+"""
+import math
+import os
+import time
+
+import cobra
+
+from syn_elong import path
+from syn_elong.excretion import default_min_secretion, exchange_id, excreted_metabolites
+
+
+def per_exchange_excretion(model, metabolites, min_secretion=default_min_secretion):
+    """ TP and FN lists with one model setup and optimization per exchange reaction. """
+    tp, fn = [], []
+    for m in metabolites:
+        rate = math.nan
+        if model.reactions.has_id(exchange_id(m)):
+            with model:
+                model.objective = exchange_id(m)
+                rate = model.slim_optimize(error_value=math.nan)
+        (tp if rate > min_secretion else fn).append(m)
+    return tp, fn
+
+
+def ims837_excretion_model(metabolites):
+    """ Copy of iMS837 with an exchange reaction on the cytosolic metabolite of every expected metabolite. """
+    from syn_elong import ims837
+    model = ims837.copy()
+    exchanges = []
+    for m in metabolites:
+        if model.metabolites.has_id(f'{m}_c') and not model.reactions.has_id(exchange_id(m)):
+            exchange = cobra.Reaction(exchange_id(m), lower_bound=0, upper_bound=1000)
+            exchange.add_metabolites({model.metabolites.get_by_id(f'{m}_c'): -1})
+            exchanges.append(exchange)
+    model.add_reactions(exchanges)
+    return model
+
+
+def main():
+    from syn_elong import expected_metab
+
+    try:
+        from concerto.testing.secretion import get_excreted_metabolites
+    except ImportError:
+        get_excreted_metabolites = None
+    if get_excreted_metabolites is not None and os.path.exists(path.joinpath('syn_elong.xml')):
+        from syn_elong import model
+        label, reference = 'concerto', get_excreted_metabolites
+    else:
+        model = ims837_excretion_model(expected_metab)
+        label, reference = 'per exchange', per_exchange_excretion
+    print(f'{model.id}, {sum(model.reactions.has_id(exchange_id(m)) for m in expected_metab)} of '
+          f'{len(expected_metab)} expected metabolites with an exchange reaction')
+
+    start = time.perf_counter()
+    tp, fn = reference(model, expected_metab)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<20}{elapsed:>10.2f} s, {len(tp)} TP, {len(fn)} FN")
+    same_sets = True
+    for label, processes in [('one LP', None), (f'{os.cpu_count()} processes', os.cpu_count())]:
+        start = time.perf_counter()
+        batched_tp, batched_fn, _ = excreted_metabolites(model, expected_metab, processes)
+        elapsed = time.perf_counter() - start
+        same = set(tp) == batched_tp and set(fn) == batched_fn
+        same_sets = same_sets and same
+        print(f"{label:<20}{elapsed:>10.2f} s, {len(batched_tp)} TP, {len(batched_fn)} FN, same sets: {same}")
+    return 0 if same_sets else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,58 @@
+"""
+GPR integration and problem size of gene-level against reaction-level strain design.
+
+First times straindesign's remove_irrelevant_genes + extend_model_gpr against
+the compiled versions in syn_elong.gpr on copies of the syn_elong model, with
+every gene knockable, and counts the pseudo reactions and metabolites each adds.
+Then preprocesses the sucrose OptCouple problem with reaction and with gene
+knockouts and prints the sizes StrainDesign.profile recorded for the
+compressed network and the MILP.
+
+    python -m syn_elong.benchmarks.bench_gpr
+"""
+import time
+
+from straindesign import networktools
+
+from syn_elong import gpr
+from syn_elong.benchmarks.sucrose_setup import sucrose_problem
+from syn_elong.strain_design_simplified import StrainDesign
+
+
+def extend(model, compiled):
+    gkos = {g.id: 1.0 for g in model.genes}
+    start = time.perf_counter()
+    if compiled:
+        _, rules = gpr.remove_irrelevant_genes(model, gpr.compile_gpr(model), [], {}, gkos)
+        gpr.extend_model_gpr(model, rules)
+    else:
+        networktools.remove_irrelevant_genes(model, [], {}, gkos)
+        networktools.extend_model_gpr(model)
+    return time.perf_counter() - start
+
+
+def main():
+    from syn_elong import model
+
+    print(f"{'GPR integration':<16}{'time (s)':>10}{'reactions':>12}{'metabolites':>14}")
+    for label, compiled in [('straindesign', False), ('compiled', True)]:
+        copy = model.copy()
+        elapsed = extend(copy, compiled)
+        print(f"{label:<16}{elapsed:>10.2f}{len(copy.reactions):>12}{len(copy.metabolites):>14}")
+
+    consistent_model, modules, rxn_cost = sucrose_problem()
+    problems = {
+        'reaction kos': {'ko_cost': rxn_cost},
+        'gene kos': {'gene_kos': True},
+    }
+    print(f"\n{'problem':<14}{'phase':<18}{'time (s)':>10}  sizes")
+    for label, kwargs in problems.items():
+        sd_helper = StrainDesign(consistent_model, sd_modules=[modules['optcouple']], **kwargs)
+        sd_helper.build_milp(max_cost=5)
+        for record in sd_helper.profile.phases:
+            if record['phase'] in ['modify_for_genes', 'compress_model', 'milp_build']:
+                print(f"{label:<14}{record['phase']:<18}{record['wall_time']:>10.2f}  {record['sizes']}")
+
+
+if __name__ == '__main__':
+    main()
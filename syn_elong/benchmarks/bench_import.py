@@ -0,0 +1,49 @@
+"""
+Cold vs warm start of the lazily loaded syn_elong package attributes.
+
+Each measurement runs in a fresh interpreter. The cold run starts with an
+empty cache directory, so it pays the SBML/JSON parse; the warm run reuses the
+pickled models written by the cold run.
+
+    python -m syn_elong.benchmarks.bench_import model ijb792 ims837
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+_snippet = """
+import time
+t0 = time.perf_counter()
+import syn_elong
+t1 = time.perf_counter()
+for name in {attributes!r}:
+    getattr(syn_elong, name)
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t1)
+"""
+
+
+def time_start(attributes, env):
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, '-c', _snippet.format(attributes=list(attributes))],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    total = time.perf_counter() - start
+    import_time, access_time = map(float, out.stdout.split())
+    return total, import_time, access_time
+
+
+def main(attributes):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SYN_ELONG_CACHE_DIR=tmp)
+        print(f"{'run':<6}{'process (s)':>14}{'import (s)':>14}{'access (s)':>14}")
+        for label in ['cold', 'warm']:
+            total, import_time, access_time = time_start(attributes, env)
+            print(f"{label:<6}{total:>14.3f}{import_time:>14.3f}{access_time:>14.3f}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or ['model', 'ijb792', 'ims837', 'expected_metab'])
@@ -0,0 +1,50 @@
+"""
+Wall time and peak RSS of the model copies StrainDesign.check_args makes.
+
+Compares three full cobra.Model.copy() calls (the old check_args) with one
+ModelSnapshot, shared by orig_model and uncompressed_model, plus one copy (the
+current one) on the syn_elong model. Each
+variant runs in a fresh interpreter so the peak RSS of one does not leak into
+the other.
+
+    python -m syn_elong.benchmarks.bench_model_copies
+"""
+import subprocess
+import sys
+
+_snippet = """
+import resource
+import time
+from syn_elong import model
+from syn_elong.model_snapshot import ModelSnapshot
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t0 = time.perf_counter()
+if {snapshots!r}:
+    copies = [ModelSnapshot(model), model.copy()]
+else:
+    copies = [model.copy(), model.copy(), model.copy()]
+t1 = time.perf_counter()
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(t1 - t0, before, after)
+"""
+
+
+def measure(snapshots):
+    out = subprocess.run(
+        [sys.executable, '-c', _snippet.format(snapshots=snapshots)],
+        capture_output=True, text=True, check=True,
+    )
+    elapsed, before, after = out.stdout.split()[-3:]
+    # ru_maxrss is in kB on linux
+    return float(elapsed), int(before) / 1024, int(after) / 1024
+
+
+def main():
+    print(f"{'variant':<24}{'time (s)':>10}{'RSS before (MB)':>18}{'peak RSS (MB)':>16}")
+    for label, snapshots in [('3 x Model.copy', False), ('snapshot + Model.copy', True)]:
+        elapsed, before, after = measure(snapshots)
+        print(f"{label:<24}{elapsed:>10.2f}{before:>18.0f}{after:>16.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Serial vs process-pool essentiality FVAs in StrainDesign preprocessing.
+
+Runs the preprocessing of the sucrose OptCouple problem (plus the PROTECT
+module, so two FVAs are fanned out per pass) once with the serial
+straindesign.fva path and once per requested worker count, and checks that
+the essential reactions and knockout costs are identical.
+
+    python -m syn_elong.benchmarks.bench_parallel_fva 2 4 8
+"""
+import sys
+import time
+
+from syn_elong.benchmarks.sucrose_setup import sucrose_problem
+from syn_elong.strain_design_simplified import StrainDesign
+
+
+def preprocess(model, modules, rxn_cost, processes):
+    start = time.perf_counter()
+    sd_helper = StrainDesign(
+        model,
+        sd_modules=[modules['optcouple'], modules['protect']],
+        ko_cost=rxn_cost,
+        processes=processes,
+    )
+    return time.perf_counter() - start, sd_helper
+
+
+def main(worker_counts):
+    model, modules, rxn_cost = sucrose_problem()
+    base_time, base = preprocess(model, modules, rxn_cost, None)
+    print(f"{'processes':<12}{'time (s)':>10}{'speedup':>10}  same result")
+    print(f"{'serial':<12}{base_time:>10.1f}{1:>10.2f}")
+    print(f"compressed-model LPs saved by the uncompressed essentiality: {base.fva_lps_saved}")
+    for processes in worker_counts:
+        elapsed, sd_helper = preprocess(model, modules, rxn_cost, processes)
+        same = (
+            sd_helper.essential_reactions == base.essential_reactions and
+            sd_helper.compressed_ko_cost == base.compressed_ko_cost
+        )
+        print(f"{processes:<12}{elapsed:>10.1f}{base_time / elapsed:>10.2f}  {same}")
+
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [2, 4])
@@ -0,0 +1,36 @@
+"""
+One SDMILP enumeration against the same enumeration split on branch reactions.
+
+Preprocesses the sucrose OptCouple problem once, then solves it with run() and
+with run_partitioned() on CYTBD4cm and NDHPQRcm (4 parts) with 1, 2 and 4 local
+workers, and prints the wall time and the number of strain designs of each.
+
+    python -m syn_elong.benchmarks.bench_partitioned
+"""
+import time
+
+from syn_elong.benchmarks.sucrose_setup import sucrose_problem
+from syn_elong.partitioned_design import run_partitioned
+from syn_elong.strain_design_simplified import StrainDesign
+
+branch_reactions = ['CYTBD4cm', 'NDHPQRcm']
+
+
+def main():
+    consistent_model, modules, rxn_cost = sucrose_problem()
+    sd_helper = StrainDesign(consistent_model, sd_modules=[modules['optcouple']], ko_cost=rxn_cost)
+    run_kwargs = {'max_solutions': 10, 'max_cost': 5, 'time_limit': 3600}
+
+    print(f"{'variant':<24}{'time (s)':>10}{'designs':>10}")
+    start = time.perf_counter()
+    sols = sd_helper.run(**run_kwargs)
+    print(f"{'single MILP':<24}{time.perf_counter() - start:>10.1f}{len(sols.reaction_sd):>10}")
+    for processes in [1, 2, 4]:
+        start = time.perf_counter()
+        sols = run_partitioned(sd_helper, branch_reactions, processes=processes, **run_kwargs)
+        label = f'4 parts, {processes} workers'
+        print(f"{label:<24}{time.perf_counter() - start:>10.1f}{len(sols.reaction_sd):>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Before/after timing of the iMS837 reaction additions (update_5).
+
+"one-by-one" replays the old pattern of one ``add_reactions([reaction])``
+call per reaction; "batched" is ``reaction_spec.apply_spec``. Both start
+from the same model and spec. Solver-interface rebuilds are counted by
+wrapping ``Model._populate_solver`` (adds reaction variables and rebuilds the
+affected mass balance rows) and ``Model.add_metabolites`` (adds mass balance
+rows for new metabolites).
+
+    python -m syn_elong.benchmarks.bench_reaction_spec [model.json]
+"""
+import sys
+import time
+
+import cobra
+
+from syn_elong import path
+from syn_elong.reaction_spec import apply_spec, build_reactions, load_spec
+
+
+def count_solver_updates(model):
+    counts = {'populate_solver': 0, 'add_metabolites': 0}
+    populate = model._populate_solver
+    add_metabolites = model.add_metabolites
+
+    def counted_populate(*args, **kwargs):
+        counts['populate_solver'] += 1
+        return populate(*args, **kwargs)
+
+    def counted_add_metabolites(*args, **kwargs):
+        counts['add_metabolites'] += 1
+        return add_metabolites(*args, **kwargs)
+
+    model._populate_solver = counted_populate
+    model.add_metabolites = counted_add_metabolites
+    return counts
+
+
+def one_by_one(model, spec):
+    _, reactions = build_reactions(model, spec)
+    for reaction in reactions:
+        model.add_reactions([reaction])
+    for row in spec['gpr'].itertuples(index=False):
+        model.reactions.get_by_id(row.reaction).gene_reaction_rule = row.gene_reaction_rule
+
+
+def main(model_path):
+    spec = load_spec(path.joinpath('data', 'ims837'))
+    base = cobra.io.load_json_model(model_path)
+    print(f"{len(spec['reactions'])} reactions, {len(spec['metabolites'])} metabolites, "
+          f"{len(spec['gpr'])} gpr rules")
+    for label, func in [('one-by-one', one_by_one), ('batched', apply_spec)]:
+        model = base.copy()
+        counts = count_solver_updates(model)
+        start = time.perf_counter()
+        func(model, spec)
+        model.slim_optimize()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<12}{elapsed:>8.3f} s  populate_solver calls: {counts['populate_solver']:>3}  "
+              f"add_metabolites calls: {counts['add_metabolites']:>3}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else path.joinpath('iJB792.json').__str__())
@@ -0,0 +1,70 @@
+"""
+The sucrose OptCouple problem of sucrose_optimization/run_strain_design.py,
+as a function the benchmarks can share.
+
+syn_elong.xml is built by model_changes.py and not checked in; where it is not
+available, ims837_sucrose_model gives a stand-in with the same sucrose export
+(update_2) on the checked-in iMS837 model.
+"""
+import cobra
+import straindesign as sd
+
+from syn_elong.media import min_media
+
+
+def ims837_sucrose_model():
+    """ Copy of iMS837 with the sucrose transporter and exchange of update_2, and its biomass named BIOMASS__1. """
+    from syn_elong import ims837
+    model = ims837.copy()
+    sucr_e = cobra.Metabolite('sucr_e', formula='C12H22O11', name='Sucrose', compartment='e')
+    transport = cobra.Reaction('SUCRt2', name='Sucrose transport via proton symport', lower_bound=-1000,
+                               upper_bound=1000)
+    transport.add_metabolites({
+        sucr_e: -1, model.metabolites.h_e: -1, model.metabolites.sucr_c: 1, model.metabolites.h_c: 1
+    })
+    exchange = cobra.Reaction('EX_sucr_e', name='Sucrose exchange', lower_bound=0, upper_bound=1000)
+    exchange.add_metabolites({sucr_e: -1})
+    model.add_reactions([transport, exchange])
+    transport.gene_reaction_rule = 'cscB'
+    model.reactions.BOF.id = 'BIOMASS__1'
+    model.repair()
+    return model
+
+
+def sucrose_problem(model=None):
+    """
+    Consistent model, strain design modules and reaction knockout costs.
+
+    Parameters
+    ----------
+    model : cobra.Model, optional
+        Defaults to syn_elong.model.
+
+    Returns
+    -------
+    cobra.Model, dict of straindesign.SDModule, dict
+    """
+    if model is None:
+        from syn_elong import model
+    model.medium = min_media
+    consistent_model = cobra.flux_analysis.fastcc(model)
+    consistent_model.medium = min_media
+
+    rxn_cost = {}
+    for rxn in consistent_model.reactions:
+        if rxn.id.startswith(('EX_', 'BIOMASS_', 'SK_', 'PHOA', 'DM_')):
+            continue
+        if rxn.gene_reaction_rule == '':
+            continue
+        rxn_cost[rxn.id] = 1
+    for rxn_id in ['BCT1_syn', 'ASPO6', 'ASPO5']:
+        rxn_cost.pop(rxn_id, None)
+
+    consistent_model.reactions.get_by_id('EX_sucr_e').lower_bound = 0
+    modules = {
+        'suppress': sd.SDModule(consistent_model, sd.names.SUPPRESS, constraints=['EX_sucr_e - 1 BIOMASS__1 <= 0']),
+        'protect': sd.SDModule(consistent_model, sd.names.PROTECT, constraints='BIOMASS__1>=.1'),
+        'optcouple': sd.SDModule(consistent_model, sd.names.OPTCOUPLE, inner_objective='BIOMASS__1',
+                                 prod_id='EX_sucr_e', min_gcp=0.1),
+    }
+    return consistent_model, modules, rxn_cost
@@ -0,0 +1,98 @@
+"""
+On-disk binary cache for parsed models and other expensive objects.
+
+Entries are pickled and stored under a key derived from the sha256 of their
+inputs, so a changed source file simply produces a new key. The cache lives in
+``~/.cache/syn_elong`` unless the ``SYN_ELONG_CACHE_DIR`` environment variable
+points somewhere else.
+"""
+import hashlib
+import logging
+import os
+import pathlib
+import pickle
+import tempfile
+
+log = logging.getLogger(__name__)
+
+_default_cache_dir = pathlib.Path.home().joinpath('.cache', 'syn_elong')
+
+
+def cache_dir(sub_dir=None):
+    """ Return (and create) the cache directory, optionally a sub folder. """
+    root = pathlib.Path(os.environ.get('SYN_ELONG_CACHE_DIR', _default_cache_dir))
+    if sub_dir is not None:
+        root = root.joinpath(sub_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def file_hash(file_path):
+    """ sha256 hex digest of a file's content. """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def text_hash(*parts):
+    """ sha256 hex digest of one or more strings. """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def dump(obj, file_path):
+    """ Pickle an object, writing to a temp file first so readers never see a partial entry. """
+    file_path = pathlib.Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load(file_path):
+    """ Unpickle an entry, returning None if it is missing or unreadable. """
+    file_path = pathlib.Path(file_path)
+    if not file_path.exists():
+        return None
+    try:
+        with open(file_path, 'rb') as f:
+            return pickle.load(f)
+    except Exception as e:
+        log.warning(f"Ignoring unreadable cache entry {file_path}: {e}")
+        return None
+
+
+def cached_model(source_path, loader):
+    """
+    Load a model through the cache.
+
+    Parameters
+    ----------
+    source_path : str
+        Path to the SBML/JSON file the model is parsed from.
+    loader : callable
+        Function that parses ``source_path`` into a cobra.Model on a cache miss.
+
+    Returns
+    -------
+    cobra.Model
+    """
+    key = file_hash(source_path)
+    entry = cache_dir('models').joinpath(f'{pathlib.Path(source_path).name}.{key}.pkl')
+    model = load(entry)
+    if model is None:
+        log.info(f"Parsing {source_path}")
+        model = loader(str(source_path))
+        dump(model, entry)
+    return model
@@ -0,0 +1,283 @@
+"""
+The project's own model checks as compact JSON.
+
+memote's snapshot runs its whole pytest suite and renders an HTML report. The
+checks here are the ones this project tracks: single gene essentiality from
+experiments.yml (syn_elong.essentiality), growth on every medium and growth
+experiment of experiments.yml, excretion of the expected metabolites
+(syn_elong.excretion) and structural consistency (mass / charge balance,
+dead-end, orphan and disconnected metabolites). They run in parallel, one per
+worker process, each on the model loaded through the cache, and the result is
+a small JSON file with the timings of every check. Two results are compared
+with diff_results, which ignores timings.
+
+    python -m syn_elong.checks --output results.json --baseline baseline.json
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import time
+
+import pandas as pd
+from straindesign import SDPool
+
+from syn_elong import essentiality, exp_file_path, path
+from syn_elong.excretion import excreted_metabolites
+from syn_elong.model_diff import model_hash
+
+log = logging.getLogger(__name__)
+
+default_model_path = path.joinpath('syn_elong.xml').__str__()
+
+# relative tolerance of numbers in diff_results
+default_rtol = 1e-6
+
+_worker = {}
+
+
+def check_essentiality(model, file_path=exp_file_path):
+    """ Confusion matrix of every essentiality experiment, with the misclassified genes. """
+    results = {}
+    for experiment in (essentiality.read_config(file_path).get('essentiality') or {}).get('experiments', {}):
+        tables = essentiality.confusion_tables(model, file_path, experiment)
+        results[experiment] = {
+            **{k: len(v) for k, v in tables.items()},
+            'accuracy': (len(tables['TP']) + len(tables['TN'])) / max(sum(len(v) for v in tables.values()), 1),
+            'FP_genes': sorted(tables['FP'].index),
+            'FN_genes': sorted(tables['FN'].index),
+        }
+    return results
+
+
+def check_growth(model, file_path=exp_file_path):
+    """ Growth on every medium and, as memote's growth experiments, on every exchange of the growth experiments. """
+    config = essentiality.read_config(file_path)
+    minimal_growth_rate = essentiality.minimal_growth(model, config.get('minimal_growth_rate'))
+    results = {'minimal_growth_rate': minimal_growth_rate, 'media': {}, 'experiments': {}}
+    for medium_id in (config.get('medium') or {}).get('definitions', {}):
+        with model:
+            model.medium = essentiality.read_medium(file_path, config, medium_id)
+            growth = model.slim_optimize(error_value=math.nan)
+        results['media'][medium_id] = {
+            'growth': None if math.isnan(growth) else growth,
+            'grows': bool(growth >= minimal_growth_rate),
+        }
+    growth_config = config.get('growth') or {}
+    for experiment, definition in (growth_config.get('experiments') or {}).items():
+        definition = definition or {}
+        data_path = os.path.join(os.path.dirname(file_path), growth_config.get('path', ''),
+                                 definition.get('filename', f'{experiment}.csv'))
+        data = pd.read_csv(data_path)
+        agree = []
+        disagree = []
+        with model:
+            if definition.get('medium') is not None:
+                model.medium = essentiality.read_medium(file_path, config, definition['medium'])
+            for row in data.itertuples(index=False):
+                with model:
+                    exchange = model.reactions.get_by_id(row.exchange)
+                    if exchange.reactants:
+                        exchange.lower_bound = -row.uptake
+                    else:
+                        exchange.upper_bound = row.uptake
+                    grows = model.slim_optimize(error_value=math.nan) >= minimal_growth_rate
+                (agree if grows == bool(row.growth) else disagree).append(row.exchange)
+        results['experiments'][experiment] = {'agree': len(agree), 'disagree': sorted(disagree)}
+    return results
+
+
+def check_excretion(model):
+    """ Excreted and not excreted expected metabolites, with their maximal secretion fluxes. """
+    from syn_elong import expected_metab
+    tp, fn, rates = excreted_metabolites(model, expected_metab)
+    return {
+        'TP': sorted(tp),
+        'FN': sorted(fn),
+        'max_secretion': {m: None if math.isnan(rate) else rate for m, rate in sorted(rates.items())},
+    }
+
+
+def check_consistency(model):
+    """ Unbalanced reactions and dead-end, orphan and disconnected metabolites. """
+    mass_unbalanced = []
+    charge_unbalanced = []
+    for r in model.reactions:
+        if r.boundary or r.objective_coefficient != 0:
+            continue
+        balance = r.check_mass_balance()
+        if any(k != 'charge' for k in balance):
+            mass_unbalanced.append(r.id)
+        if 'charge' in balance:
+            charge_unbalanced.append(r.id)
+    dead_ends = []
+    orphans = []
+    disconnected = []
+    for m in model.metabolites:
+        produced = consumed = False
+        for r in m.reactions:
+            c = r.get_coefficient(m)
+            produced |= c > 0 and r.upper_bound > 0 or c < 0 and r.lower_bound < 0
+            consumed |= c < 0 and r.upper_bound > 0 or c > 0 and r.lower_bound < 0
+        if not m.reactions:
+            disconnected.append(m.id)
+        elif not consumed:
+            dead_ends.append(m.id)
+        elif not produced:
+            orphans.append(m.id)
+    return {
+        'reactions': len(model.reactions),
+        'metabolites': len(model.metabolites),
+        'genes': len(model.genes),
+        'mass_unbalanced': sorted(mass_unbalanced),
+        'charge_unbalanced': sorted(charge_unbalanced),
+        'dead_end_metabolites': sorted(dead_ends),
+        'orphan_metabolites': sorted(orphans),
+        'disconnected_metabolites': sorted(disconnected),
+    }
+
+
+checks = {
+    'essentiality': check_essentiality,
+    'growth': check_growth,
+    'excretion': check_excretion,
+    'consistency': check_consistency,
+}
+
+
+def _load(model_path):
+    import cobra
+    from syn_elong.cache import cached_model
+    if model_path.endswith('.json'):
+        return cached_model(model_path, cobra.io.load_json_model)
+    return cached_model(model_path, cobra.io.read_sbml_model)
+
+
+def _worker_init(model_path):
+    _worker['model'] = _load(model_path)
+
+
+def _run_check(name):
+    start = time.perf_counter()
+    record = {}
+    try:
+        record['result'] = checks[name](_worker['model'])
+    except Exception as e:
+        log.exception(f'Check {name} failed.')
+        record['error'] = repr(e)
+    record['time'] = time.perf_counter() - start
+    return name, record
+
+
+def run_checks(model_path=default_model_path, names=None, processes=None):
+    """
+    Run checks on a model file.
+
+    Parameters
+    ----------
+    model_path : str
+        SBML or json model.
+    names : list of str, optional
+        Checks to run, all of syn_elong.checks.checks by default.
+    processes : int, optional
+        Number of worker processes, one per check by default. With 0, the checks run one after the other in this
+        process.
+
+    Returns
+    -------
+    dict
+        {'model', 'model_hash', 'time', 'checks': {name: {'result' or 'error', 'time'}}}
+    """
+    names = list(checks) if names is None else list(names)
+    unknown = [n for n in names if n not in checks]
+    if unknown:
+        raise Exception(f'Unknown checks {unknown}, choose from {list(checks)}.')
+    start = time.perf_counter()
+    _worker_init(model_path)
+    results = {
+        'model': model_path,
+        'model_hash': model_hash(_worker['model']),
+        'checks': {},
+    }
+    processes = len(names) if processes is None else processes
+    if processes == 0:
+        results['checks'].update(map(_run_check, names))
+    else:
+        with SDPool(processes, initializer=_worker_init, initargs=(model_path,)) as pool:
+            results['checks'].update(pool.imap_unordered(_run_check, names))
+    results['checks'] = {n: results['checks'][n] for n in names}
+    results['time'] = time.perf_counter() - start
+    return results
+
+
+def _differences(old, new, rtol):
+    if isinstance(old, dict) and isinstance(new, dict):
+        differences = {}
+        for k in sorted(set(old) | set(new), key=str):
+            d = _differences(old.get(k), new.get(k), rtol)
+            if d is not None:
+                differences[k] = d
+        return differences or None
+    if isinstance(old, list) and isinstance(new, list):
+        added = [v for v in new if v not in old]
+        removed = [v for v in old if v not in new]
+        return {'added': added, 'removed': removed} if added or removed else None
+    if isinstance(old, (int, float)) and isinstance(new, (int, float)) and not isinstance(old, bool):
+        return None if math.isclose(old, new, rel_tol=rtol) else [old, new]
+    return None if old == new else [old, new]
+
+
+def diff_results(baseline, current, rtol=default_rtol):
+    """
+    Differences between two run_checks results, without timings.
+
+    Returns
+    -------
+    dict
+        {check: nested differences}: [old, new] for changed values and {'added', 'removed'} for lists. Checks without
+        differences are left out.
+    """
+    differences = {}
+    for name in sorted(set(baseline['checks']) | set(current['checks'])):
+        old = {k: v for k, v in baseline['checks'].get(name, {}).items() if k != 'time'}
+        new = {k: v for k, v in current['checks'].get(name, {}).items() if k != 'time'}
+        d = _differences(old, new, rtol)
+        if d is not None:
+            differences[name] = d
+    return differences
+
+
+def write_json(results, file_path):
+    with open(file_path, 'w') as f:
+        json.dump(results, f, indent=2, default=str)
+
+
+def read_json(file_path):
+    with open(file_path) as f:
+        return json.load(f)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Run the model checks of syn_elong and write them as JSON.')
+    parser.add_argument('model', nargs='?', default=default_model_path)
+    parser.add_argument('--checks', nargs='+', choices=list(checks), help='checks to run, all by default')
+    parser.add_argument('--processes', type=int, help='worker processes, 0 to run in this process')
+    parser.add_argument('--output', default='check_results.json')
+    parser.add_argument('--baseline', help='result to compare with, exits with 1 if anything differs')
+    args = parser.parse_args(args)
+    results = run_checks(args.model, args.checks, args.processes)
+    write_json(results, args.output)
+    for name, record in results['checks'].items():
+        log.info(f"{name}: {'failed' if 'error' in record else 'done'} in {record['time']:.1f} s")
+    failed = any('error' in record for record in results['checks'].values())
+    if args.baseline is not None:
+        differences = diff_results(read_json(args.baseline), results)
+        print(json.dumps(differences, indent=2, default=str))
+        failed = failed or bool(differences)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    raise SystemExit(main())
@@ -1,6 +1,8 @@
+import math
+
 from memote.utils import annotate, wrapper
 from syn_elong import model as syn, expected_metab
-from concerto.testing.secretion import get_excreted_metabolites
+from syn_elong.excretion import excreted_metabolites
 
 
 @annotate(
@@ -16,8 +18,12 @@ def test_excreted():
     simulated with natural medium.
     """
     ann = test_excreted.annotation
-    tp, fn = get_excreted_metabolites(syn, expected_metab)
-    ann["data"] = {'TP': sorted(tp), 'FN': sorted(fn)}
+    tp, fn, rates = excreted_metabolites(syn, expected_metab)
+    ann["data"] = {
+        'TP': sorted(tp),
+        'FN': sorted(fn),
+        'max_secretion': {m: None if math.isnan(rate) else rate for m, rate in sorted(rates.items())},
+    }
     ann["metric"] = len(ann["data"]['FN'])
     ann["message"] = wrapper.fill(
         f"""Model is able to excrete {len(ann['data']['TP'])} and unable to 
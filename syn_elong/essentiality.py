@@ -0,0 +1,332 @@
+"""
+Single gene essentiality of the knock-out library without memote.
+
+memote's essentiality experiment runs cobra's single_gene_deletion on one
+process, one LP per gene of data/essentiality/syn_elo_knockdown.csv. Most of
+these genes disable no reaction at all (isozymes, subunits of complexes with
+other subunits that are knocked out elsewhere, genes without reactions) or the
+same reactions as another gene. The compiled GPR rules give the set of
+reactions each gene disables without touching the model, so genes are grouped
+by that set, genes that disable nothing get the wild-type growth, and only one
+LP per distinct set is solved, spread over a pool of worker processes.
+
+Medium, experiment data and minimal growth rate are read from
+data/experiments.yml as memote does: a gene is essential if the growth of its
+knockout is below minimal_growth_rate, 0.1 times the growth of the model before
+the medium is applied if the file does not set it.
+
+IncrementalEssentiality keeps, for every reaction set, its growth and the
+support of its optimal flux distribution, and after a model edit only solves
+the sets whose result the edit could change:
+
+* a set that grew keeps its result if no reaction it carries flux through
+  changed and every other changed reaction can still carry zero flux, its old
+  flux distribution is then still feasible, so it grows at least as much;
+* a set that did not grow keeps its result if every change only shrinks the
+  flux space (removed reactions, tightened bounds), so it grows at most as much.
+
+Changes to reactions the set knocks out do not count. Kept growth rates are
+therefore bounds, not exact values, but the essentiality they give is exact.
+
+    python -m syn_elong.essentiality
+"""
+import logging
+import math
+import os
+
+import pandas as pd
+from cobra.core.solution import get_solution
+from ruamel.yaml import YAML
+from straindesign import SDPool
+
+from syn_elong import cache, exp_file_path
+from syn_elong.gpr import compile_gpr
+
+log = logging.getLogger(__name__)
+
+default_chunk_size = 16
+
+# memote's default when experiments.yml sets no minimal_growth_rate
+default_threshold = 0.1
+
+# fluxes below this are not part of the support of a flux distribution
+support_tolerance = 1e-9
+
+# what a stored growth of IncrementalEssentiality is
+EXACT = 'exact'
+LOWER = 'lower bound'
+UPPER = 'upper bound'
+
+_worker = {}
+
+
+def read_config(file_path=exp_file_path):
+    """ Content of a memote experiments.yml. """
+    with open(file_path) as f:
+        return YAML(typ='safe').load(f)
+
+
+def read_medium(file_path, config, medium_id):
+    """ {exchange: uptake} of a medium defined in a memote experiments.yml. """
+    media = config['medium']
+    medium_file = os.path.join(os.path.dirname(file_path), media.get('path', ''),
+                               media['definitions'][medium_id]['filename'])
+    return pd.read_csv(medium_file).set_index('exchange')['uptake'].to_dict()
+
+
+def load_experiment(file_path=exp_file_path, experiment='knockouts'):
+    """
+    Data, medium and minimal growth rate of an essentiality experiment of a memote experiments.yml.
+
+    Returns
+    -------
+    pandas.DataFrame, dict, float or None
+        The gene, essential table, the medium as {exchange: uptake} (None without one) and the minimal growth rate
+        set in the file.
+    """
+    config = read_config(file_path)
+    definition = config['essentiality']['experiments'][experiment] or {}
+    path = os.path.join(os.path.dirname(file_path), config['essentiality'].get('path', ''))
+    data = pd.read_csv(os.path.join(path, definition.get('filename', f'{experiment}.csv')))
+    data = data[['gene', 'essential']].astype({'gene': str, 'essential': bool})
+    medium = None
+    if definition.get('medium') is not None:
+        medium = read_medium(file_path, config, definition['medium'])
+    return data, medium, config.get('minimal_growth_rate')
+
+
+def minimal_growth(model, minimal_growth_rate=None):
+    """ minimal_growth_rate, or memote's default for the model without the medium of the experiment. """
+    if minimal_growth_rate is not None:
+        return minimal_growth_rate
+    minimal_growth_rate = model.slim_optimize() * default_threshold
+    if math.isnan(minimal_growth_rate):
+        return model.tolerance
+    return minimal_growth_rate
+
+
+def group_by_disabled_reactions(model, genes, gpr=None):
+    """ {frozenset of reaction ids: [genes whose knockout disables exactly these reactions]}. """
+    gpr = compile_gpr(model) if gpr is None else gpr
+    groups = {}
+    for g in genes:
+        groups.setdefault(frozenset(gpr.disabled_reactions([g])), []).append(g)
+    return groups
+
+
+def _check_genes(model, genes):
+    missing = [g for g in genes if not model.genes.has_id(g)]
+    if missing:
+        raise Exception(f'{len(missing)} genes of the experiment are not in the model: {missing[:10]}')
+
+
+def _worker_init(model, support):
+    _worker['model'] = model
+    _worker['support'] = support
+
+
+def knockout_growth(model, reactions, support=False):
+    """ Maximal growth of the model with the reactions knocked out, nan if infeasible. With support, also the
+    reactions that carry flux in the optimal solution. """
+    with model:
+        for reac_id in reactions:
+            model.reactions.get_by_id(reac_id).bounds = (0, 0)
+        growth = model.slim_optimize(error_value=math.nan)
+        if not support:
+            return growth
+        carrying = frozenset()
+        if not math.isnan(growth):
+            fluxes = get_solution(model).fluxes
+            carrying = frozenset(fluxes.index[fluxes.abs() > support_tolerance])
+        return growth, carrying
+
+
+def _solve_chunk(chunk):
+    return [(i, knockout_growth(_worker['model'], reactions, _worker['support'])) for i, reactions in chunk]
+
+
+def solve_sets(model, reaction_sets, processes=None, chunk_size=default_chunk_size, support=False):
+    """ {reaction set: knockout_growth} of a list of reaction sets, on a pool if processes is given. """
+    # sets with shared reactions next to each other, so each LP starts from a similar basis
+    order = sorted(range(len(reaction_sets)), key=lambda i: sorted(reaction_sets[i]))
+    chunks = [
+        [(i, reaction_sets[i]) for i in order[start:start + chunk_size]] for start in range(0, len(order), chunk_size)
+    ]
+    if processes is None:
+        _worker_init(model, support)
+        solved = [r for chunk in chunks for r in _solve_chunk(chunk)]
+    else:
+        with SDPool(processes, initializer=_worker_init, initargs=(model, support)) as pool:
+            solved = [r for result in pool.imap_unordered(_solve_chunk, chunks) for r in result]
+    return {reaction_sets[i]: result for i, result in solved}
+
+
+def _essentiality_table(genes, groups, growth, minimal_growth_rate):
+    table = pd.DataFrame(
+        [(g, growth[s]) for s, group in groups.items() for g in group], columns=['gene', 'growth']
+    ).set_index('gene').loc[list(genes)]
+    table['essential'] = (table['growth'] < minimal_growth_rate) | table['growth'].isna()
+    return table
+
+
+def single_gene_essentiality(model, genes, minimal_growth_rate, processes=None, chunk_size=default_chunk_size):
+    """
+    Growth and essentiality of single gene knockouts.
+
+    Parameters
+    ----------
+    model : cobra.Model
+        The model with the medium and objective of the experiment.
+    genes : list of str
+    minimal_growth_rate : float
+        Knockouts that grow less than this (or not at all) are essential.
+    processes : int, optional
+        Number of worker processes. If None, the LPs are solved in this process.
+    chunk_size : int
+        LPs per task.
+
+    Returns
+    -------
+    pandas.DataFrame
+        growth and essential, indexed by gene.
+    """
+    _check_genes(model, genes)
+    groups = group_by_disabled_reactions(model, genes)
+    sets = [s for s in groups if s]
+    log.info(f'{len(genes)} gene knockouts disable {len(sets)} distinct reaction sets.')
+    growth = solve_sets(model, sets, processes, chunk_size)
+    growth[frozenset()] = model.slim_optimize(error_value=math.nan)
+    return _essentiality_table(genes, groups, growth, minimal_growth_rate)
+
+
+def _confusion(data, simulated):
+    merged = data.set_index('gene').rename(columns={'essential': 'predicted'})
+    merged['actual'] = simulated['essential'].astype(bool)
+    merged['growth'] = simulated['growth']
+    return {
+        'TP': merged[~merged.actual & ~merged.predicted],
+        'FP': merged[merged.actual & ~merged.predicted],
+        'FN': merged[~merged.actual & merged.predicted],
+        'TN': merged[merged.actual & merged.predicted],
+    }
+
+
+def confusion_tables(model, file_path=exp_file_path, experiment='knockouts', processes=None,
+                     chunk_size=default_chunk_size):
+    """
+    Simulated against experimental essentiality, as create_ge_confusion_matrix of the gapfill notebook.
+
+    The tables have the experimental essentiality as 'predicted', the simulated one as 'actual' and the simulated
+    growth, indexed by gene. TP: non-essential in both, FP: essential only in the model, TN: essential in both,
+    FN: essential only in the experiment.
+
+    Returns
+    -------
+    dict
+        {'TP': pandas.DataFrame, 'FP': ..., 'FN': ..., 'TN': ...}
+    """
+    data, medium, minimal_growth_rate = load_experiment(file_path, experiment)
+    minimal_growth_rate = minimal_growth(model, minimal_growth_rate)
+    with model:
+        if medium is not None:
+            model.medium = medium
+        simulated = single_gene_essentiality(model, list(data['gene']), minimal_growth_rate, processes, chunk_size)
+    return _confusion(data, simulated)
+
+
+def lp_fields(model):
+    """ {reaction id: (lower bound, upper bound, stoichiometry)}, what the LP of a reaction depends on. """
+    return {
+        r.id: (float(r.lower_bound), float(r.upper_bound),
+               tuple(sorted((m.id, float(c)) for m, c in r.metabolites.items())))
+        for r in model.reactions
+    }
+
+
+def _shrinks(old, new):
+    """ Whether a change of a reaction's LP fields (None: not in the model) only removes fluxes. """
+    if new is None:
+        return True
+    return old is not None and old[2] == new[2] and new[0] >= old[0] and new[1] <= old[1]
+
+
+def kept_bound(result, knocked_out, changes, minimal_growth_rate):
+    """
+    Whether a stored result of a reaction set gives the same essentiality after the changes: LOWER or UPPER if its
+    growth is still a lower or upper bound that decides it, None if the set has to be solved again.
+    """
+    growth, support, bound = result
+    changes = {r: c for r, c in changes.items() if r not in knocked_out}
+    if bound != UPPER and not math.isnan(growth) and growth >= minimal_growth_rate:
+        # the flux distribution the growth was solved with is still feasible
+        if all(r not in support and (new is None or new[0] <= 0 <= new[1]) for r, (old, new) in changes.items()):
+            return LOWER
+    elif bound != LOWER and (math.isnan(growth) or growth < minimal_growth_rate):
+        # the flux space only shrank
+        if all(_shrinks(old, new) for old, new in changes.values()):
+            return UPPER
+    return None
+
+
+class IncrementalEssentiality(object):
+    def __init__(self, file_path=exp_file_path, experiment='knockouts', processes=None,
+                 chunk_size=default_chunk_size, state_path=None):
+        """
+        file_path, experiment:
+            The essentiality experiment of a memote experiments.yml.
+        processes, chunk_size:
+            As for single_gene_essentiality.
+        state_path (str):
+            File the last result is stored in, so later runs (e.g. after the next model update) start from it.
+        """
+        self.data, self.medium, self.minimal_growth_rate = load_experiment(file_path, experiment)
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.state_path = state_path
+        self.state = cache.load(state_path) if state_path is not None else None
+        self.last_run = {}
+
+    def evaluate(self, model):
+        """ Confusion tables as confusion_tables, solving only the reaction sets the changes since the last
+        evaluation may affect. """
+        genes = list(self.data['gene'])
+        _check_genes(model, genes)
+        minimal_growth_rate = minimal_growth(model, self.minimal_growth_rate)
+        with model:
+            if self.medium is not None:
+                model.medium = self.medium
+            fields = lp_fields(model)
+            objective = (str(model.objective.expression), model.objective.direction)
+            groups = group_by_disabled_reactions(model, genes)
+            results = {}
+            state = self.state
+            if state is not None and state['objective'] == objective:
+                changes = {
+                    r: (state['fields'].get(r), fields.get(r))
+                    for r in set(state['fields']) | set(fields) if state['fields'].get(r) != fields.get(r)
+                }
+                for s, result in state['results'].items():
+                    bound = kept_bound(result, s, changes, minimal_growth_rate) if s in groups else None
+                    if bound is not None:
+                        results[s] = (result[0], result[1], bound)
+            sets = [s for s in groups if s not in results]
+            log.info(f'{len(genes)} gene knockouts disable {len(groups)} distinct reaction sets, {len(results)} '
+                     f'results kept, {len(sets)} solved.')
+            solved = solve_sets(model, sets, self.processes, self.chunk_size, support=True)
+            results.update((s, (growth, support, EXACT)) for s, (growth, support) in solved.items())
+        self.last_run = {'reaction_sets': len(groups), 'kept': len(groups) - len(sets), 'solved': len(sets)}
+        self.state = {'objective': objective, 'fields': fields, 'results': results}
+        if self.state_path is not None:
+            cache.dump(self.state, self.state_path)
+        growth = {s: result[0] for s, result in results.items()}
+        simulated = _essentiality_table(genes, groups, growth, minimal_growth_rate)
+        return _confusion(self.data, simulated)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    from syn_elong import model as syn_model
+
+    tables = confusion_tables(syn_model, processes=os.cpu_count())
+    for label, table in tables.items():
+        print(f'{label}: {len(table)}')
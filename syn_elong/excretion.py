@@ -0,0 +1,102 @@
+"""
+Excretion check of the expected metabolites on one LP.
+
+concerto's get_excreted_metabolites sets up the model and optimizes it again
+for every exchange reaction in data/excreted/metabolites.csv. Here the
+objective of the model's solver problem is emptied once and only the
+coefficients of one exchange reaction are switched in and out per metabolite,
+so every LP after the first starts from the basis of the one before. With
+processes, the metabolites are split into one contiguous part per worker, each
+solved the same way on the worker's copy of the model.
+
+A metabolite is excreted (TP) if the maximal flux of its exchange reaction
+EX_<bigg id>_e on the current medium of the model exceeds min_secretion. It is
+not (FN) if the flux is lower, the LP is infeasible or the model has no such
+exchange reaction.
+
+    python -m syn_elong.excretion
+"""
+import logging
+import math
+
+from optlang.symbolics import Zero
+from straindesign import SDPool
+
+log = logging.getLogger(__name__)
+
+default_min_secretion = 1e-6
+
+_worker = {}
+
+
+def exchange_id(bigg_id):
+    return f'EX_{bigg_id}_e'
+
+
+def max_secretion(model, metabolites):
+    """ {metabolite: maximal flux of its exchange reaction}, nan if infeasible or without exchange reaction. """
+    rates = {}
+    with model:
+        model.objective = model.problem.Objective(Zero, direction='max')
+        for m in metabolites:
+            if not model.reactions.has_id(exchange_id(m)):
+                rates[m] = math.nan
+                continue
+            reaction = model.reactions.get_by_id(exchange_id(m))
+            model.objective.set_linear_coefficients({reaction.forward_variable: 1, reaction.reverse_variable: -1})
+            rates[m] = model.slim_optimize(error_value=math.nan)
+            model.objective.set_linear_coefficients({reaction.forward_variable: 0, reaction.reverse_variable: 0})
+    return rates
+
+
+def _worker_init(model):
+    _worker['model'] = model
+
+
+def _solve_part(metabolites):
+    return max_secretion(_worker['model'], metabolites)
+
+
+def excreted_metabolites(model, metabolites, processes=None, min_secretion=default_min_secretion):
+    """
+    Metabolites the model can and cannot excrete, as concerto.testing.secretion.get_excreted_metabolites.
+
+    Parameters
+    ----------
+    model : cobra.Model
+        The model with the medium to test on.
+    metabolites : iterable of str
+        BiGG ids of the metabolites, without compartment.
+    processes : int, optional
+        Number of worker processes. If None, all LPs are solved in this process.
+    min_secretion : float
+        Smallest maximal exchange flux that counts as excretion.
+
+    Returns
+    -------
+    set, set, dict
+        The excreted (TP) and not excreted (FN) metabolites and the maximal exchange flux of every metabolite.
+    """
+    metabolites = list(dict.fromkeys(metabolites))
+    if processes is None:
+        rates = max_secretion(model, metabolites)
+    else:
+        size = math.ceil(len(metabolites) / processes) or 1
+        parts = [metabolites[start:start + size] for start in range(0, len(metabolites), size)]
+        rates = {}
+        with SDPool(max(len(parts), 1), initializer=_worker_init, initargs=(model,)) as pool:
+            for part_rates in pool.imap_unordered(_solve_part, parts):
+                rates.update(part_rates)
+    tp = {m for m, rate in rates.items() if rate > min_secretion}
+    fn = set(rates) - tp
+    log.info(f'{len(tp)} of {len(metabolites)} metabolites are excreted.')
+    return tp, fn, rates
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    from syn_elong import model as syn_model, expected_metab
+
+    _, _, secretion = excreted_metabolites(syn_model, expected_metab)
+    for metabolite, rate in sorted(secretion.items()):
+        print(f'{metabolite:<12}{rate:>12.4f}')
@@ -0,0 +1,221 @@
+"""
+Decompressed strain designs as products of alternatives.
+
+``straindesign.networktools.expand_sd`` turns a compressed MILP solution into
+every combination of the uncompressed reactions a lumped intervention can stand
+for, and ``filter_sd_maxcost`` then walks over all of these dicts. Expanding each
+compressed intervention on its own gives the same designs as a product: one
+factor per compressed intervention, holding its alternatives. FactoredDesigns
+keeps that product and only combines the factors when iterated, so counting,
+reaction frequencies and the max_cost filter work on the factors.
+"""
+import itertools
+from math import prod
+
+import pandas as pd
+from straindesign.names import KICOST, KOCOST
+
+# tolerance of filter_sd_maxcost
+_cost_tolerance = 1e-8
+
+
+def expand_intervention(reac_id, value, cmp_map_reac):
+    """
+    Uncompressed alternatives for one intervention of the compressed model.
+
+    Follows straindesign.networktools.expand_sd for a single reaction: the compression steps are undone in reverse
+    order and every member of a lumped reaction is expanded again by the earlier steps.
+
+    Returns
+    -------
+    list of dict
+        Each dict is one alternative set of uncompressed interventions.
+    """
+    if not cmp_map_reac:
+        return [{reac_id: value}]
+    step, earlier_steps = cmp_map_reac[-1], cmp_map_reac[:-1]
+    members = step['reac_map_exp'].get(reac_id, {})
+    if len(members) <= 1:
+        return expand_intervention(reac_id, value, earlier_steps)
+
+    def together(interventions):
+        # members that are intervened on together, each of them expands on its own
+        expanded = [expand_intervention(d, v, earlier_steps) for d, v in interventions.items()]
+        return [_merge(combination) for combination in itertools.product(*expanded)]
+
+    ko_cost, ki_cost = step[KOCOST], step[KICOST]
+    if value < 0:  # KO
+        if step['parallel']:
+            return together({d: value for d in members if d in ko_cost})
+        return [a for d in members if d in ko_cost for a in expand_intervention(d, value, earlier_steps)]
+    if value > 0:  # KI
+        if step['parallel']:
+            ki_members = [d for d in members if d in ki_cost]
+            # other reactions do not need to be knocked in
+            return [
+                a for d in ki_members for a in together({e: (value if e == d else 0.0) for e in ki_members})
+            ]
+        return together({d: value for d in members if d in ki_cost})
+    # KI that was not introduced, none of the expanded reactions are inserted
+    return together({d: value for d in members if d in ki_cost})
+
+
+def _merge(dicts):
+    merged = {}
+    for d in dicts:
+        merged.update(d)
+    return merged
+
+
+class FactoredDesigns(object):
+    """
+    Strain designs stored as one product of alternative sets per MILP solution.
+
+    Iterating yields the designs as dicts, one at a time, like the list returned by expand_sd, filter_sd_maxcost
+    and postprocess_reg_sd. With a max_cost, to_list() sorts all designs by their cost, keeping the order of equal
+    costs (MILP solution, then alternatives), which is the order filter_sd_maxcost gives the list of expand_sd.
+    """
+
+    def __init__(self, designs=None, ko_cost=None, ki_cost=None, reg_cost=None, max_cost=None):
+        # designs[i][j] is the list of alternatives (dicts) of the j-th intervention of MILP solution i
+        self.designs = [] if designs is None else designs
+        self.ko_cost = {} if ko_cost is None else ko_cost
+        self.ki_cost = {} if ki_cost is None else ki_cost
+        self.reg_cost = {} if reg_cost is None else reg_cost
+        self.max_cost = max_cost
+
+    @classmethod
+    def from_compressed(cls, cmp_sd, cmp_map_reac, ko_cost, ki_cost, reg_cost=None, max_cost=None):
+        """ Factored decompression of compressed strain designs (dicts) with costs of the uncompressed model. """
+        designs = [
+            [expand_intervention(reac_id, value, cmp_map_reac) for reac_id, value in s.items()] for s in cmp_sd
+        ]
+        factored = cls(designs, ko_cost, ki_cost, reg_cost)
+        if max_cost:
+            factored = factored.filter_max_cost(max_cost)
+        return factored
+
+    def cost(self, interventions):
+        """ Cost of the interventions that are made (non-zero values), as in filter_sd_maxcost. """
+        return sum(
+            (self.ko_cost[k] if k in self.ko_cost else self.ki_cost.get(k, 0)) if v != 0 else 0
+            for k, v in interventions.items()
+        )
+
+    def _factor_costs(self, factor):
+        return [self.cost(a) for a in factor]
+
+    def filter_max_cost(self, max_cost):
+        """
+        Designs that do not cost more than max_cost.
+
+        Alternatives that exceed max_cost even with the cheapest choice for every other intervention are dropped
+        right away; the remaining combinations are checked while iterating.
+        """
+        if self.max_cost is not None:
+            max_cost = min(max_cost, self.max_cost)
+        designs = []
+        for factors in self.designs:
+            min_costs = [min(self._factor_costs(f), default=0) for f in factors]
+            total = sum(min_costs)
+            designs.append([
+                [a for a in f if total - m + self.cost(a) <= max_cost + _cost_tolerance]
+                for f, m in zip(factors, min_costs)
+            ])
+        return FactoredDesigns(designs, self.ko_cost, self.ki_cost, self.reg_cost, max_cost)
+
+    def extend(self, other):
+        """ Append the MILP solutions of another FactoredDesigns with the same costs and max_cost. """
+        self.designs.extend(other.designs)
+
+    def _cost_counts(self, factors):
+        """ Number of combinations of the factors per total cost. """
+        counts = {0: 1}
+        for factor in factors:
+            combined = {}
+            for c, n in counts.items():
+                for a_cost in self._factor_costs(factor):
+                    key = round(c + a_cost, 8)
+                    combined[key] = combined.get(key, 0) + n
+            counts = combined
+        return counts
+
+    def _within_budget(self, counts, spent=0):
+        return sum(n for c, n in counts.items() if c + spent <= self.max_cost + _cost_tolerance)
+
+    def __len__(self):
+        if self.max_cost is None:
+            return sum(prod(len(f) for f in factors) for factors in self.designs)
+        return sum(self._within_budget(self._cost_counts(factors)) for factors in self.designs)
+
+    def _combinations(self, factors):
+        """ (cost, design) of every combination within max_cost. """
+        if self.max_cost is None:
+            for combination in itertools.product(*factors):
+                yield None, _merge(combination)
+            return
+        # cheapest completion of the remaining factors, to prune branches that cannot fit in max_cost
+        min_costs = [min(self._factor_costs(f), default=0) for f in factors]
+        remaining = [sum(min_costs[i:]) for i in range(len(factors) + 1)]
+
+        def branch(i, spent, chosen):
+            if i == len(factors):
+                yield spent, _merge(chosen)
+                return
+            for a in factors[i]:
+                c = spent + self.cost(a)
+                if c + remaining[i + 1] <= self.max_cost + _cost_tolerance:
+                    yield from branch(i + 1, c, chosen + [a])
+
+        yield from branch(0, 0, [])
+
+    def _postprocess(self, design):
+        # as postprocess_reg_sd, mark regulatory interventions with true or false
+        for k, v in self.reg_cost.items():
+            if k in design:
+                design.pop(k)
+                design[v['str']] = True
+            else:
+                design[v['str']] = False
+        return design
+
+    def __iter__(self):
+        for factors in self.designs:
+            for _, design in self._combinations(factors):
+                yield self._postprocess(design)
+
+    def to_list(self):
+        """ All designs as dicts, sorted by cost over all MILP solutions if there is a max_cost. """
+        combinations = [c for factors in self.designs for c in self._combinations(factors)]
+        if self.max_cost is not None:
+            combinations.sort(key=lambda x: x[0])
+        return [self._postprocess(design) for _, design in combinations]
+
+    def to_frame(self):
+        """ All designs as a table with one row per design and one column per intervened reaction. """
+        return pd.DataFrame(self.to_list())
+
+    def reaction_frequency(self):
+        """
+        Number of designs in which each reaction is intervened on.
+
+        Returns
+        -------
+        pandas.Series
+            Counts per reaction id, most frequent first.
+        """
+        frequency = {}
+        for factors in self.designs:
+            for i, factor in enumerate(factors):
+                others = factors[:i] + factors[i + 1:]
+                if self.max_cost is None:
+                    num_others = prod(len(f) for f in others)
+                else:
+                    other_counts = self._cost_counts(others)
+                for a in factor:
+                    if self.max_cost is not None:
+                        num_others = self._within_budget(other_counts, self.cost(a))
+                    for k, v in a.items():
+                        if v != 0 and num_others:
+                            frequency[k] = frequency.get(k, 0) + num_others
+        return pd.Series(frequency, dtype=int).sort_values(ascending=False)
@@ -0,0 +1,302 @@
+"""
+Gap-filling of false-positive essential genes on worker processes.
+
+The gapfill notebook knocks out every gene the model calls essential but the
+knock-out library does not (FP of syn_elong.essentiality.confusion_tables) and
+runs cobra's gapfill against the universal model for it, one gene after the
+other, dropping failures silently. Here every worker process loads the model
+and the universal model once and gap-fills one gene at a time, sent to it over
+a pipe. A gene that takes longer than the timeout gets its worker terminated
+(and replaced) and is recorded as timed out, a gene whose worker dies as
+crashed. Every result, also failures, timeouts and crashes, is written to the
+result store as soon as it arrives:
+
+    <cache>/gapfill/<key>/<gene>.pkl
+
+where the key is a hash of the model (with its medium), the universal model
+source and the gapfill settings, so a rerun on the same model only gap-fills
+the genes that have no result yet or timed out or crashed before (the timeout
+is not part of the key, a rerun can give them more time). rank_reactions counts, for every candidate
+reaction, the genes it rescues, which is how rxns_to_add_for_ge.txt was put
+together by hand.
+
+    python -m syn_elong.gapfill --processes 8 --output rxns_to_add_for_ge.txt
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import wait
+
+import pandas as pd
+
+from syn_elong import cache
+from syn_elong.model_diff import model_hash
+
+log = logging.getLogger(__name__)
+
+default_timeout = 600
+default_iterations = 4
+
+OK = 'ok'
+FAILED = 'failed'
+TIMEOUT = 'timeout'
+CRASHED = 'crashed'
+
+# results that are not computed again, timeouts and crashes are
+done_statuses = [OK, FAILED]
+
+
+def load_universal(universal_path=None):
+    """ Universal model from a json file (through the cache), concerto's universal model by default. """
+    if universal_path is None:
+        from concerto.utils.biolog_help import load_universal_model
+        return load_universal_model()
+    import cobra
+    return cache.cached_model(universal_path, cobra.io.load_json_model)
+
+
+def gapfill_gene(model, universal, gene, iterations=default_iterations):
+    """ Gap-filling solutions (lists of universal reaction ids) of the model with a gene knocked out. """
+    from cobra.flux_analysis import gapfilling
+    with model:
+        model.genes.get_by_id(gene).knock_out()
+        solutions = gapfilling.gapfill(
+            model, universal, demand_reactions=False, exchange_reactions=False, iterations=iterations
+        )
+    return [sorted(r.id for r in solution) for solution in solutions]
+
+
+def _serve(conn, model, universal_path, iterations):
+    """ Worker: gap-fill the genes received on conn until None is received. """
+    universal = load_universal(universal_path)
+    conn.send(None)
+    while True:
+        gene = conn.recv()
+        if gene is None:
+            return
+        start = time.perf_counter()
+        try:
+            record = {'status': OK, 'solutions': gapfill_gene(model, universal, gene, iterations)}
+        except Exception as e:
+            record = {'status': FAILED, 'solutions': [], 'error': repr(e)}
+        record.update({'gene': gene, 'time': time.perf_counter() - start})
+        conn.send(record)
+
+
+class GapfillStore(object):
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _path(self, gene):
+        return os.path.join(self.store_dir, f'{gene}.pkl')
+
+    def __contains__(self, gene):
+        return os.path.exists(self._path(gene))
+
+    def done(self, gene):
+        """ Whether the gene has a result that is not computed again. """
+        record = cache.load(self._path(gene)) if gene in self else None
+        return record is not None and record['status'] in done_statuses
+
+    def put(self, record):
+        cache.dump(record, self._path(record['gene']))
+
+    def results(self, genes=None):
+        """ {gene: record} of the stored genes, or of the given ones that are stored. """
+        if genes is None:
+            genes = [name[:-len('.pkl')] for name in os.listdir(self.store_dir) if name.endswith('.pkl')]
+        records = {g: cache.load(self._path(g)) for g in genes}
+        return {g: r for g, r in records.items() if r is not None}
+
+
+def store_key(model, universal_path=None, iterations=default_iterations):
+    universal_source = 'concerto' if universal_path is None else cache.file_hash(universal_path)
+    return cache.text_hash(model_hash(model), universal_source, iterations, cache.file_hash(__file__))
+
+
+class _Worker(object):
+    def __init__(self, context, model, universal_path, iterations):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_serve, args=(child_conn, model, universal_path, iterations), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.gene = None
+        self.started = None
+
+    def send(self, gene):
+        self.gene = gene
+        self.started = time.perf_counter()
+        self.conn.send(gene)
+
+    def stop(self, terminate=False):
+        if terminate:
+            self.process.terminate()
+        elif self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        self.process.join()
+        self.conn.close()
+
+
+def gapfill_genes(model, genes, universal_path=None, processes=1, timeout=default_timeout,
+                  iterations=default_iterations, store_dir=None, poll_interval=1):
+    """
+    Gap-fill the model with each of the genes knocked out, one gene per worker process at a time.
+
+    Parameters
+    ----------
+    model : cobra.Model
+        The model with the medium of the essentiality experiment.
+    genes : list of str
+    universal_path : str, optional
+        json universal model, concerto's universal model by default.
+    processes : int
+        Number of worker processes.
+    timeout : float
+        Seconds a single gene may take, its worker is replaced after that. Timed out genes are gap-filled again by
+        the next call.
+    iterations : int
+        As for cobra's gapfill.
+    store_dir : str, optional
+        Folder of the result store, by default a folder of the gapfill cache named after the model, universal model
+        and settings.
+    poll_interval : float
+        Seconds between timeout checks.
+
+    Returns
+    -------
+    dict
+        {gene: {'gene', 'status' (OK, FAILED, TIMEOUT or CRASHED), 'solutions', 'time', 'error'}}
+    """
+    if store_dir is None:
+        store_dir = cache.cache_dir('gapfill').joinpath(store_key(model, universal_path, iterations))
+    store = GapfillStore(store_dir)
+    genes = list(dict.fromkeys(genes))
+    pending = [g for g in genes if not store.done(g)]
+    log.info(f'Gap-filling {len(pending)} genes, {len(genes) - len(pending)} found in {store_dir}.')
+    context = multiprocessing.get_context('spawn')
+    workers = []
+
+    def start_worker():
+        workers.append(_Worker(context, model, universal_path, iterations))
+
+    def complete(record):
+        store.put(record)
+        log.info(f"  {record['gene']}: {record['status']}, {len(record['solutions'])} solutions in "
+                 f"{record['time']:.1f} s.")
+
+    try:
+        for _ in range(min(processes, len(pending))):
+            start_worker()
+        while pending or any(w.gene is not None for w in workers):
+            for w in workers:
+                if w.ready and w.gene is None and pending:
+                    w.send(pending.pop(0))
+            for conn in wait([w.conn for w in workers], timeout=poll_interval):
+                w = next(w for w in workers if w.conn is conn)
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    # the worker died, e.g. a solver crash
+                    w.process.join()
+                    if not w.ready:
+                        raise Exception(f'A gap-filling worker exited with {w.process.exitcode} while loading the '
+                                        f'universal model.')
+                    if w.gene is not None:
+                        complete({'gene': w.gene, 'status': CRASHED, 'solutions': [],
+                                  'time': time.perf_counter() - w.started,
+                                  'error': f'worker exited with {w.process.exitcode}'})
+                    workers.remove(w)
+                    w.stop()
+                    if pending:
+                        start_worker()
+                    continue
+                if message is None:
+                    w.ready = True
+                else:
+                    complete(message)
+                    w.gene = None
+            now = time.perf_counter()
+            for w in [w for w in workers if w.gene is not None and now - w.started > timeout]:
+                complete({'gene': w.gene, 'status': TIMEOUT, 'solutions': [], 'time': now - w.started,
+                          'error': f'no result within {timeout} s'})
+                workers.remove(w)
+                w.stop(terminate=True)
+                if pending:
+                    start_worker()
+    finally:
+        for w in workers:
+            w.stop(terminate=w.gene is not None)
+    return store.results(genes)
+
+
+def rank_reactions(results):
+    """
+    Candidate reactions ranked by the number of genes whose first gap-filling solution contains them, then by the
+    number of genes any of whose solutions does.
+
+    Returns
+    -------
+    pandas.DataFrame
+        reaction, first_solution_genes, any_solution_genes and genes (the genes any solution rescues).
+    """
+    genes = {}
+    first = {}
+    for gene, record in results.items():
+        for i, solution in enumerate(record['solutions']):
+            for reac_id in solution:
+                genes.setdefault(reac_id, set()).add(gene)
+                if i == 0:
+                    first.setdefault(reac_id, set()).add(gene)
+    table = pd.DataFrame([
+        {'reaction': reac_id, 'first_solution_genes': len(first.get(reac_id, ())),
+         'any_solution_genes': len(rescued), 'genes': sorted(rescued)}
+        for reac_id, rescued in genes.items()
+    ], columns=['reaction', 'first_solution_genes', 'any_solution_genes', 'genes'])
+    table = table.sort_values(['first_solution_genes', 'any_solution_genes', 'reaction'],
+                              ascending=[False, False, True])
+    return table.reset_index(drop=True)
+
+
+def write_reaction_list(ranking, file_path):
+    """ Reactions of the first solutions, one id per line as in rxns_to_add_for_ge.txt, best ranked first. """
+    with open(file_path, 'w') as f:
+        for reac_id in ranking.loc[ranking['first_solution_genes'] > 0, 'reaction']:
+            f.write(reac_id + '\n')
+
+
+def main(args=None):
+    from syn_elong import model
+    from syn_elong.essentiality import confusion_tables, load_experiment
+
+    parser = argparse.ArgumentParser(description='Gap-fill the false-positive essential genes of the model.')
+    parser.add_argument('--universal', help='json universal model, concerto\'s by default')
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--timeout', type=float, default=default_timeout)
+    parser.add_argument('--iterations', type=int, default=default_iterations)
+    parser.add_argument('--output', default='rxns_to_add_for_ge.txt')
+    args = parser.parse_args(args)
+    genes = sorted(confusion_tables(model, processes=args.processes)['FP'].index)
+    _, medium, _ = load_experiment()
+    with model:
+        if medium is not None:
+            model.medium = medium
+        results = gapfill_genes(model, genes, args.universal, args.processes, args.timeout, args.iterations)
+    statuses = pd.Series([r['status'] for r in results.values()]).value_counts().to_dict()
+    log.info(f'{len(genes)} false-positive genes: {statuses}')
+    ranking = rank_reactions(results)
+    write_reaction_list(ranking, args.output)
+    print(ranking.head(30).to_string())
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
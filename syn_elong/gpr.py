@@ -0,0 +1,307 @@
+"""
+GPR rules compiled once for gene-level strain design.
+
+straindesign's ``remove_irrelevant_genes`` runs every rule string through
+sympy's to_dnf, and ``extend_model_gpr`` splits the strings on ' or ' and
+' and ', so it needs rules in DNF and adds one pseudo reaction per AND term it
+meets, scanning the model's metabolite list for every gene it looks up. A rule
+like the 27-gene complex of CBFCum with one isozyme choice inside becomes three
+29-gene AND terms that way.
+
+CompiledGPR parses each rule once into a normalized expression tree (nested
+terms of the same operator are flattened and children are kept as frozensets),
+so identical sub-expressions of different reactions are equal objects and are
+added to the network only once by ``extend_model_gpr`` here. The same trees
+give each rule as DNF clauses stored as bitsets over the gene index, which
+answer "which reactions does this set of knockouts disable" without touching
+the model.
+"""
+import ast
+import hashlib
+import logging
+
+import numpy as np
+from cobra import Metabolite, Reaction
+
+from syn_elong import cache
+
+AND = 'and'
+OR = 'or'
+
+# generated ids longer than this are trimmed, GLPK and Gurobi allow 255 characters
+_max_name_len = 230
+
+
+def _node(op, children):
+    """ Normalized AND / OR node: nested nodes of the same operator are flattened and duplicates dropped. """
+    flat = set()
+    for child in children:
+        if isinstance(child, tuple) and child[0] == op:
+            flat.update(child[1])
+        else:
+            flat.add(child)
+    if len(flat) == 1:
+        return flat.pop()
+    return op, frozenset(flat)
+
+
+def parse_rule(reaction):
+    """ Expression tree of a reaction's GPR rule: a gene id or (AND / OR, frozenset of children). None without. """
+    if not reaction.gene_reaction_rule:
+        return None
+    gpr = getattr(reaction, 'gpr', None)
+    if gpr is not None:
+        body = gpr.body
+    else:
+        # cobra < 0.26
+        from cobra.core.gene import parse_gpr
+        body = parse_gpr(reaction.gene_reaction_rule)[0].body
+    return _from_ast(body)
+
+
+def _from_ast(node):
+    if isinstance(node, ast.Expression):
+        return _from_ast(node.body)
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.BoolOp):
+        return _node(AND if isinstance(node.op, ast.And) else OR, [_from_ast(v) for v in node.values])
+    raise Exception(f'Unsupported element {ast.dump(node)} in GPR rule.')
+
+
+def substitute(expr, true_genes):
+    """ Expression with the genes in true_genes set to true. Returns True if the whole rule becomes true. """
+    if isinstance(expr, str):
+        return True if expr in true_genes else expr
+    op, children = expr
+    children = [substitute(c, true_genes) for c in children]
+    if op == OR and any(c is True for c in children):
+        return True
+    children = [c for c in children if c is not True]
+    if not children:
+        return True
+    return _node(op, children)
+
+
+def to_string(expr):
+    """ GPR rule string of an expression. """
+    if isinstance(expr, str):
+        return expr
+    op, children = expr
+    parts = sorted(to_string(c) if isinstance(c, str) else f'({to_string(c)})' for c in children)
+    return f' {op} '.join(parts)
+
+
+def genes_of(expr):
+    if isinstance(expr, str):
+        return {expr}
+    return set().union(*(genes_of(c) for c in expr[1]))
+
+
+def to_dnf(expr):
+    """ Minimal DNF of a (monotone) expression as a list of frozensets of genes. """
+    if isinstance(expr, str):
+        return [frozenset([expr])]
+    op, children = expr
+    if op == OR:
+        clauses = [c for child in children for c in to_dnf(child)]
+    else:
+        clauses = [frozenset()]
+        for child in children:
+            clauses = [c | d for c in clauses for d in to_dnf(child)]
+    # absorption: a clause that contains another clause is redundant
+    clauses = sorted(set(clauses), key=len)
+    minimal = []
+    for c in clauses:
+        if not any(m <= c for m in minimal):
+            minimal.append(c)
+    return minimal
+
+
+class CompiledGPR(object):
+    def __init__(self, rules):
+        """
+        rules (dict):
+            {reaction id: expression} of the reactions with a GPR rule, see parse_rule.
+        """
+        self.rules = rules
+        self.genes = sorted(set().union(*(genes_of(e) for e in rules.values())))
+        self.gene_index = {g: i for i, g in enumerate(self.genes)}
+        self.gene_reactions = {g: set() for g in self.genes}
+        # clause bitsets: a reaction is disabled when every one of its clauses contains a knocked out gene
+        self.clauses = {}
+        for reac_id, expr in rules.items():
+            dnf = to_dnf(expr)
+            self.clauses[reac_id] = [self.mask(c) for c in dnf]
+            for g in set().union(*dnf):
+                self.gene_reactions[g].add(reac_id)
+
+    @classmethod
+    def from_model(cls, model):
+        return cls({r.id: parse_rule(r) for r in model.reactions if r.gene_reaction_rule})
+
+    def mask(self, genes):
+        """ Bitset of a set of genes. """
+        return sum(1 << self.gene_index[g] for g in genes if g in self.gene_index)
+
+    def disabled_reactions(self, genes):
+        """ Reactions whose GPR rule is false when the genes are knocked out. """
+        ko = self.mask(genes)
+        candidates = set().union(*(self.gene_reactions.get(g, ()) for g in genes))
+        return {r for r in candidates if all(c & ko for c in self.clauses[r])}
+
+    def essential_genes(self, reac_id):
+        """ Genes whose knockout alone disables the reaction, they are part of every clause. """
+        return set(frozenset.intersection(*to_dnf(self.rules[reac_id])))
+
+    def substitute(self, true_genes):
+        """ CompiledGPR with the genes in true_genes set to true, rules that become true are dropped. """
+        rules = {r: substitute(e, true_genes) for r, e in self.rules.items()}
+        return CompiledGPR({r: e for r, e in rules.items() if e is not True})
+
+
+def compile_gpr(model):
+    """ CompiledGPR of a model, loaded from the on-disk cache when the model has the same rules. """
+    rules = [(r.id, r.gene_reaction_rule) for r in model.reactions if r.gene_reaction_rule]
+    entry = cache.cache_dir('gpr').joinpath(f'{cache.text_hash(rules, cache.file_hash(__file__))}.pkl')
+    compiled = cache.load(entry)
+    if compiled is None:
+        compiled = CompiledGPR.from_model(model)
+        cache.dump(compiled, entry)
+    return compiled
+
+
+def remove_irrelevant_genes(model, compiled, essential_reacs, gkis, gkos):
+    """
+    Same as straindesign.networktools.remove_irrelevant_genes, on a CompiledGPR of the model.
+
+    Genes that only affect blocked or essential reactions, or whose knockout disables an essential reaction, are
+    removed from the model and from gkos, and the GPR rules are simplified with them set to true. Only the rules that
+    change are written back to the model.
+
+    Returns
+    -------
+    dict, CompiledGPR
+        The updated gkos and the simplified rules.
+    """
+    essential_reacs = set(essential_reacs)
+    # 1) rules of blocked reactions are dropped
+    blocked = {r.id for r in model.reactions if r.bounds == (0, 0) and r.id in compiled.rules}
+    rules = {r: e for r, e in compiled.rules.items() if r not in blocked}
+    compiled = CompiledGPR(rules)
+    protected = set()
+    for g, reactions in compiled.gene_reactions.items():
+        # 2) genes that only occur in essential reactions
+        if reactions <= essential_reacs:
+            protected.add(g)
+    for reac_id in essential_reacs & set(compiled.rules):
+        # 3) genes that are essential to essential reactions
+        protected.update(compiled.essential_genes(reac_id))
+    for g in protected:
+        gkos.pop(g, None)
+    names = {g.id: g.name for g in model.genes}
+    # 4) genes that cannot be knocked out, except the ones that can be added
+    protected.update(g for g in compiled.genes if g not in gkos and names.get(g) not in gkos)
+    protected.difference_update(g for g in compiled.genes if g in gkis or names.get(g) in gkis)
+    simplified = compiled.substitute(protected)
+    for r in model.reactions:
+        if r.id in blocked or (r.id in compiled.rules and r.id not in simplified.rules):
+            r.gene_reaction_rule = ''
+        elif r.id in simplified.rules and simplified.rules[r.id] != compiled.rules[r.id]:
+            r.gene_reaction_rule = to_string(simplified.rules[r.id])
+    # 5) genes that are left without reactions or protected
+    for g in model.genes[::-1]:
+        if not g.reactions or g.id in protected:
+            model.genes.remove(g)
+    return gkos, simplified
+
+
+def _truncate(met_id):
+    if len(met_id) <= _max_name_len:
+        return met_id
+    return met_id[0:_max_name_len - 21] + '_' + hashlib.sha256(met_id.encode()).hexdigest()[:20]
+
+
+def extend_model_gpr(model, compiled, use_names=False):
+    """
+    Same as straindesign.networktools.extend_model_gpr, built from a CompiledGPR of the model.
+
+    Rules need not be in DNF. Every distinct sub-expression gets one pseudo metabolite, shared by all reactions
+    whose rules contain it and named after a hash of its rule string, and all pseudo reactions are added to the model
+    in one call.
+
+    Returns
+    -------
+    dict
+        {'Reaction1': {'Reaction1': 1, 'Reaction1_reverse_a59c': -1}} for the reversible reactions that were split.
+    """
+    reac_ids = {r.id for r in model.reactions}
+    gene_reac_ids = {g.id: (g.name if use_names and g.name else g.id) for g in model.genes}
+    overlap = [g for g in compiled.genes if gene_reac_ids.get(g, g) in reac_ids]
+    if overlap:
+        raise Exception('GPR rule integration requires distinct identifiers for reactions and genes. '
+                        f'The following identifiers are both, reaction IDs and gene ids or names: {overlap}')
+
+    # split reversible reactions with genes, as extend_model_gpr
+    reac_map = {}
+    rev_reac = set()
+    del_reac = set()
+    for r in model.reactions:
+        reac_map[r.id] = {}
+        if r.id not in compiled.rules:
+            reac_map[r.id][r.id] = 1.0
+            continue
+        if r.bounds[0] < 0:
+            r_rev = (r * -1)
+            if r.bounds[1] > 0:
+                r_rev.id = _truncate(r.id + '_reverse_' + hex(hash(r))[8:])
+            r_rev.lower_bound = np.max([0, r_rev.lower_bound])
+            reac_map[r.id][r_rev.id] = -1.0
+            rev_reac.add(r_rev)
+        if r.bounds[1] > 0:
+            reac_map[r.id][r.id] = 1.0
+            r._lower_bound = np.max([0, r._lower_bound])
+        else:
+            del_reac.add(r)
+    model.remove_reactions(del_reac)
+    model.add_reactions(rev_reac)
+
+    metabolites = {}
+    pseudo_reactions = []
+
+    def pseudo_reaction(reac_id, stoichiometry):
+        w = Reaction(_truncate(reac_id), lower_bound=0, upper_bound=np.inf)
+        w.add_metabolites(stoichiometry)
+        pseudo_reactions.append(w)
+
+    def metabolite(expr):
+        if expr in metabolites:
+            return metabolites[expr]
+        if isinstance(expr, str):
+            met = Metabolite(_truncate(f'g_{expr}'))
+            pseudo_reaction(gene_reac_ids.get(expr, expr), {met: 1.0})
+        else:
+            op, children = expr
+            child_mets = sorted((metabolite(c) for c in children), key=lambda m: m.id)
+            # joined child ids are ambiguous for nested rules (a and (b or c) / (a and b) or c), the rule string is not
+            met = Metabolite(f'{op}_' + hashlib.sha256(to_string(expr).encode()).hexdigest()[:20])
+            if op == AND:
+                pseudo_reaction(f'R_{met.id}', {**{m: -1.0 for m in child_mets}, met: 1.0})
+            else:
+                for k, m in enumerate(child_mets):
+                    pseudo_reaction(f'R{k}_{met.id}', {m: -1.0, met: 1.0})
+        metabolites[expr] = met
+        return met
+
+    rule_mets = {}
+    for orig_id, split in reac_map.items():
+        if orig_id in compiled.rules:
+            # the reverse reaction of a split reaction carries the same rule
+            met = metabolite(compiled.rules[orig_id])
+            rule_mets.update({reac_id: met for reac_id in split})
+    logging.info(f'  {len(metabolites)} GPR pseudo metabolites and {len(pseudo_reactions)} pseudo reactions for '
+                 f'{len(compiled.rules)} rules.')
+    model.add_reactions(pseudo_reactions)
+    for reac_id, met in rule_mets.items():
+        model.reactions.get_by_id(reac_id).add_metabolites({model.metabolites.get_by_id(met.id): -1.0})
+    return reac_map
@@ -9,29 +9,34 @@ Living model is syn_elong.xml
 Adding on biolog exchange reactions to model to accurate reflect biolog tests.
 
 """
-from memote.suite.cli.reports import diff
+import argparse
 import cobra
 import os
 import logging
 from cobra import Reaction, Metabolite
-from concerto.utils.biolog_help import add_biolog_exchanges, load_universal_model
+from concerto.utils.biolog_help import add_biolog_exchanges
 from syn_elong.updates_from_ims837 import update_5
+from syn_elong.pipeline import run_pipeline
+from syn_elong.cache import file_hash
+from syn_elong.universal_store import universal_store, source_hash
+from syn_elong.cache import cache_dir, cached_model
+from syn_elong.model_diff import diff_models, write_html, write_json
 log = logging.getLogger()
 
 _file_path = os.path.dirname(__file__)
 starting_model_f_name = 'iJB785.xml'
 s_model_path = os.path.join(_file_path, starting_model_f_name)
 
-starting_model = cobra.io.read_sbml_model(s_model_path)
 
-# starting_model = cobra.io.load_json_model('iJB792.json')
-starting_model.id = "syn_elong"
+def load_starting_model():
+    starting_model = cobra.io.read_sbml_model(s_model_path)
+    # starting_model = cobra.io.load_json_model('iJB792.json')
+    starting_model.id = "syn_elong"
+    return starting_model
 
 output_model_name = 'syn_elong.xml'
 output_model_path = os.path.join(_file_path, output_model_name)
 
-universal_model = load_universal_model()
-
 
 def write_model(model):
     cobra.io.write_sbml_model(model, output_model_path)
@@ -49,7 +54,7 @@ def update_2(model):
     log.info("Adding Sucrose Transporter")
 
     # Copy sucrose transport from universal model
-    sucr_transport = universal_model.reactions.SUCRt2.copy()
+    sucr_transport = universal_store().get_reaction('SUCRt2')
     sucr_transport.lower_bound = -1000
     # Add the transport reaction to the model
     model.add_reactions([sucr_transport])
@@ -70,12 +75,11 @@ def update_2(model):
 def update_3(model):
     # updates the model to add the reactions from ijb792
     rxns = ['MPTSS', 'MOADSUx', 'GTPC', 'CPMPS', 'MPTS', 'MPTAT', 'MOCOS', 'MDH']
-    reactions_to_add = set()
-    for reaction_id in rxns:
-        reaction = universal_model.reactions.get_by_id(reaction_id)
-        reactions_to_add.add(reaction.copy())
-    model.add_reactions(reactions_to_add)
-    model.remove_reactions([universal_model.reactions.get_by_id('ORNTA')])
+    model.add_reactions(universal_store().get_reactions(rxns))
+    # ORNTA used to be removed by passing the universal model's reaction object, which cobra rejects with a
+    # warning, so it has always stayed in the model. Removing it would change syn_elong.xml.
+
+
 
 
     return model
@@ -88,31 +92,68 @@ def update_4(model):
         'ASNTRS_1', 'GLGB', 'FRDO', 'ACGAM6PS', 'PGPS1819Z160', 'PAPSSH', 'GLYOX_2',
         'APSR', 'AIRC1', 'ILETA2', 'PRFGS_1', 'AHSERL2', 'FASC161ACP', 'GLCS2', 'UAGDP_c', 'P5CCD', 'UGP_PGM_c',
     }
-    reactions_to_add = set()
-    for reaction_id in reaction_ids:
-        reaction = universal_model.reactions.get_by_id(reaction_id)
-        reactions_to_add.add(reaction.copy())
-    model.add_reactions(reactions_to_add)
+    model.add_reactions(universal_store().get_reactions(sorted(reaction_ids)))
     return model
 
 
+# the stages copy reactions from the universal store, their checkpoints depend on its source
+update_2.data_hashes = update_3.data_hashes = update_4.data_hashes = [source_hash]
+
+
 def update_model(model, update_func):
     return update_func(model)
 
+
+update_funcs = [update_1, update_2, update_3, update_5]
+
+
 def process_model_steps():
-    model = starting_model
-    update_funcs = [update_1, update_2, update_3, update_5]
-    for update_func in update_funcs:
-        model = update_model(model, update_func)
+    # each update is checkpointed, so only edited steps (and those after them) are rerun
+    model = run_pipeline(
+        load_starting_model,
+        file_hash(s_model_path),
+        update_funcs,
+    )
     write_model(model)
 
 
+def report_differences(run_memote=False):
+    model_paths = [s_model_path, output_model_path]
+    if run_memote:
+        # full memote test suite on both models, slow
+        from memote.suite.cli.reports import diff
+        diff(
+            [
+                *model_paths,
+                '--filename', os.path.join(_file_path, 'model_differences.html')
+            ]
+        )
+        return
+    old_model, new_model = [cached_model(p, cobra.io.read_sbml_model) for p in model_paths]
+    differences = diff_models(old_model, new_model)
+    write_json(differences, os.path.join(_file_path, 'model_differences.json'))
+    write_html(differences, os.path.join(_file_path, 'model_differences.html'))
+    log.info(f"Model differences: {differences['summary']}")
+
+
+def report_essentiality(processes=None):
+    # only the gene knockouts the updates may affect are simulated again, see syn_elong.essentiality
+    from syn_elong.essentiality import IncrementalEssentiality
+    model = cached_model(output_model_path, cobra.io.read_sbml_model)
+    evaluation = IncrementalEssentiality(
+        processes=processes, state_path=cache_dir('essentiality').joinpath('knockouts.pkl')
+    )
+    counts = {k: len(v) for k, v in evaluation.evaluate(model).items()}
+    log.info(f"Essentiality: {counts}, {evaluation.last_run}")
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--memote', action='store_true', help='use memote diff instead of the structural diff')
+    parser.add_argument('--essentiality', action='store_true',
+                        help='update the essentiality confusion matrix of the knock-out library')
+    args = parser.parse_args()
     process_model_steps()
-    model_paths = [s_model_path, output_model_path]
-    diff(
-        [
-            *model_paths,
-            '--filename', os.path.join(_file_path, 'model_differences.html')
-        ]
-    )
\ No newline at end of file
+    report_differences(run_memote=args.memote)
+    if args.essentiality:
+        report_essentiality(processes=os.cpu_count())
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+Structural diff of two models.
+
+Every reaction, metabolite and gene is reduced to a signature: a hash of its
+comparable fields (bounds, GPR, stoichiometry, ...). Entities whose signature
+hash matches are skipped; only the rest are compared field by field. This is
+much faster than running the memote test suite on both models and the result
+is machine comparable.
+"""
+import hashlib
+import html
+import json
+import logging
+
+log = logging.getLogger(__name__)
+
+
+def _reaction_fields(reaction):
+    return {
+        'name': reaction.name,
+        'subsystem': reaction.subsystem,
+        'lower_bound': float(reaction.lower_bound),
+        'upper_bound': float(reaction.upper_bound),
+        'gene_reaction_rule': reaction.gene_reaction_rule,
+        'stoichiometry': {m.id: float(c) for m, c in sorted(reaction.metabolites.items(), key=lambda x: x[0].id)},
+    }
+
+
+def _metabolite_fields(metabolite):
+    return {
+        'name': metabolite.name,
+        'formula': metabolite.formula,
+        'compartment': metabolite.compartment,
+        'charge': None if metabolite.charge is None else float(metabolite.charge),
+    }
+
+
+def _gene_fields(gene):
+    return {
+        'name': gene.name,
+        'reactions': sorted(r.id for r in gene.reactions),
+    }
+
+
+_entities = {
+    'reactions': _reaction_fields,
+    'metabolites': _metabolite_fields,
+    'genes': _gene_fields,
+}
+
+
+def _signature(fields):
+    return hashlib.sha1(json.dumps(fields, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def model_signatures(model):
+    """
+    Per-entity fields and signature hashes of a model.
+
+    Returns
+    -------
+    dict
+        {entity type: {id: (hash, fields)}}
+    """
+    signatures = {}
+    for entity, get_fields in _entities.items():
+        signatures[entity] = {}
+        for item in getattr(model, entity):
+            fields = get_fields(item)
+            signatures[entity][item.id] = (_signature(fields), fields)
+    return signatures
+
+
+def model_hash(model):
+    """ Single hash over the signatures of all reactions, metabolites and genes. """
+    signatures = model_signatures(model)
+    parts = []
+    for entity in _entities:
+        parts.extend(f'{item_id}:{h}' for item_id, (h, _) in sorted(signatures[entity].items()))
+    return _signature(parts)
+
+
+def diff_models(old_model, new_model):
+    """
+    Compare two models on reactions, metabolites and genes.
+
+    Parameters
+    ----------
+    old_model : cobra.Model
+    new_model : cobra.Model
+
+    Returns
+    -------
+    dict
+        For every entity type the ``added`` and ``removed`` ids and the
+        ``changed`` ids with ``{field: [old value, new value]}``, plus a
+        ``summary`` of counts.
+    """
+    old = model_signatures(old_model)
+    new = model_signatures(new_model)
+    result = {'models': [old_model.id, new_model.id], 'summary': {}}
+    for entity in _entities:
+        old_ids = set(old[entity])
+        new_ids = set(new[entity])
+        changed = {}
+        for item_id in sorted(old_ids & new_ids):
+            old_hash, old_fields = old[entity][item_id]
+            new_hash, new_fields = new[entity][item_id]
+            if old_hash == new_hash:
+                continue
+            changed[item_id] = {
+                k: [old_fields[k], new_fields[k]] for k in old_fields if old_fields[k] != new_fields[k]
+            }
+        result[entity] = {
+            'added': sorted(new_ids - old_ids),
+            'removed': sorted(old_ids - new_ids),
+            'changed': changed,
+        }
+        result['summary'][entity] = {k: len(v) for k, v in result[entity].items()}
+    return result
+
+
+def write_json(differences, file_path):
+    with open(file_path, 'w') as f:
+        json.dump(differences, f, indent=2, default=str)
+
+
+def write_html(differences, file_path):
+    """ Small self-contained html report of a diff. """
+    e = html.escape
+    lines = [
+        '<html><head><meta charset="utf-8"><title>Model differences</title>',
+        '<style>body{font-family:sans-serif} table{border-collapse:collapse} '
+        'td,th{border:1px solid #ccc;padding:2px 6px;vertical-align:top}</style></head><body>',
+        f'<h1>{e(str(differences["models"][0]))} &rarr; {e(str(differences["models"][1]))}</h1>',
+        '<table><tr><th></th><th>added</th><th>removed</th><th>changed</th></tr>',
+    ]
+    for entity, counts in differences['summary'].items():
+        lines.append(f'<tr><td>{entity}</td><td>{counts["added"]}</td>'
+                     f'<td>{counts["removed"]}</td><td>{counts["changed"]}</td></tr>')
+    lines.append('</table>')
+    for entity in differences['summary']:
+        d = differences[entity]
+        lines.append(f'<h2>{entity}</h2>')
+        for status in ['added', 'removed']:
+            if d[status]:
+                lines.append(f'<p><b>{status}:</b> {e(", ".join(d[status]))}</p>')
+        if d['changed']:
+            lines.append('<table><tr><th>id</th><th>field</th><th>old</th><th>new</th></tr>')
+            for item_id, fields in d['changed'].items():
+                for field, (old_value, new_value) in fields.items():
+                    lines.append(f'<tr><td>{e(item_id)}</td><td>{e(field)}</td>'
+                                 f'<td>{e(str(old_value))}</td><td>{e(str(new_value))}</td></tr>')
+            lines.append('</table>')
+    lines.append('</body></html>')
+    with open(file_path, 'w') as f:
+        f.write('\n'.join(lines))
@@ -0,0 +1,40 @@
+"""
+Read-only snapshot of a cobra model.
+
+``cobra.Model.copy()`` deep copies every reaction, metabolite and gene and
+builds a new solver problem, which takes seconds and a lot of memory for a
+genome-scale model. A ModelSnapshot stores the model as cobra's plain dict
+serialization instead: it is cheap to take, holds no solver and does not
+change when the source model is edited afterwards. The lookups StrainDesign
+needs while preprocessing are answered from the snapshot; a full cobra.Model
+is only built, once, when ``model`` is first accessed.
+"""
+from cobra.io import model_from_dict, model_to_dict
+
+
+class ModelSnapshot(object):
+    def __init__(self, model):
+        self.id = model.id
+        self._data = model_to_dict(model, sort=False)
+        self._reaction_genes = {r.id: frozenset(g.id for g in r.genes) for r in model.reactions}
+        self._gene_names = {g.id: g.name for g in model.genes}
+        self._model = None
+
+    @property
+    def reaction_ids(self):
+        return list(self._reaction_genes)
+
+    def reaction_genes(self, reaction_id):
+        """ Ids of the genes in the GPR rule of a reaction. """
+        return self._reaction_genes[reaction_id]
+
+    def gene_name(self, gene_id):
+        return self._gene_names[gene_id]
+
+    @property
+    def model(self):
+        """ cobra.Model as it was when the snapshot was taken, built on first access. """
+        if self._model is None:
+            self._model = model_from_dict(self._data)
+        return self._model
+
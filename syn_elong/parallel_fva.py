@@ -0,0 +1,176 @@
+"""
+Process-pool FVA over several constraint sets at once.
+
+StrainDesign runs one FVA per (non-SUPPRESS) strain design module, and every
+FVA solves two LPs per reaction. ``fva_modules`` builds the LP of every module
+once, then fans out (module, chunk of LP indices) tasks over a pool of worker
+processes. Every chunk is solved on its own solver instance, built inside the
+worker, so a chunk's result does not depend on which worker ran it or what
+that worker solved before. With a fixed chunk size the results are therefore
+identical for any number of processes, including the in-process run with
+``processes=1``. The LPs, objective setup and post-processing are the same as
+in ``straindesign.fva``.
+"""
+import logging
+from contextlib import redirect_stdout, redirect_stderr
+from io import StringIO
+
+import numpy as np
+from pandas import DataFrame
+from scipy import sparse
+from cobra.util import create_stoichiometric_matrix
+from straindesign import MILP_LP, SDPool, fva, select_solver
+from straindesign.lptools import idx2c
+from straindesign.names import GLPK, OPTIMAL, UNBOUNDED
+from straindesign.parse_constr import lineqlist2mat, parse_constraints
+
+log = logging.getLogger(__name__)
+
+
+def fva_lp(model, constraints):
+    """ LP matrices of an FVA problem, built as in straindesign.fva. """
+    reaction_ids = model.reactions.list_attr('id')
+    A_eq = sparse.csr_matrix(create_stoichiometric_matrix(model))
+    b_eq = [0] * len(model.metabolites)
+    A_ineq = sparse.csr_matrix((0, len(reaction_ids)))
+    b_ineq = []
+    if constraints:
+        constraints = parse_constraints(constraints, reaction_ids)
+        A_ineq, b_ineq, A_eq_c, b_eq_c = lineqlist2mat(constraints, reaction_ids)
+        A_eq = sparse.vstack((A_eq, A_eq_c))
+        b_eq = b_eq + b_eq_c
+    lb = [r.lower_bound for r in model.reactions]
+    ub = [r.upper_bound for r in model.reactions]
+    return A_ineq, b_ineq, A_eq, b_eq, lb, ub
+
+
+_worker = {}
+
+default_chunk_size = 64
+
+
+def _worker_init(lps, solver):
+    _worker['lps'] = lps
+    _worker['solver'] = solver
+
+
+def _build_lp(lp_matrices, solver):
+    A_ineq, b_ineq, A_eq, b_eq, lb, ub = lp_matrices
+    with redirect_stdout(StringIO()), redirect_stderr(StringIO()):
+        lp = MILP_LP(A_ineq=A_ineq, b_ineq=b_ineq, A_eq=A_eq, b_eq=b_eq, lb=lb, ub=ub, solver=solver)
+        # as straindesign's fva workers, one thread per LP, the parallelism comes from the worker processes
+        if lp.solver == 'cplex':
+            lp.backend.parameters.threads.set(1)
+        elif lp.solver == 'gurobi':
+            lp.backend.params.Threads = 1
+    lp.prev = 0
+    return lp
+
+
+def solve_chunk(lp_matrices, solver, indices):
+    """ Min/max LPs with the given straindesign FVA indices on a fresh solver instance. """
+    lp = None
+    values = []
+    with redirect_stdout(StringIO()), redirect_stderr(StringIO()):
+        for i in indices:
+            # like straindesign, GLPK gets a fresh LP for every solve, reusing it is unstable
+            if lp is None or solver == GLPK:
+                lp = _build_lp(lp_matrices, solver)
+            c = idx2c(i, lp.prev)
+            if lp.solver in ['cplex', 'gurobi']:
+                lp.backend.set_objective_idx(c)
+                values.append(lp.backend.slim_solve())
+            else:
+                lp.set_objective_idx(c)
+                values.append(lp.slim_solve())
+            lp.prev = c[0][0]
+    return values
+
+
+def _worker_solve(task):
+    module, indices = task
+    return module, indices, solve_chunk(_worker['lps'][module], _worker['solver'], indices)
+
+
+def _to_frame(x, reaction_ids):
+    x = [v if abs(v) >= 1e-11 else 0.0 for v in x]
+    return DataFrame(
+        {
+            'minimum': x[1::2],
+            'maximum': [-v for v in x[0::2]],
+        },
+        index=reaction_ids,
+    )
+
+
+def fva_modules(model, constraint_sets, solver=None, processes=None, chunk_size=default_chunk_size,
+                reaction_subsets=None):
+    """
+    FVA of a model under each of several constraint sets.
+
+    Parameters
+    ----------
+    model : cobra.Model
+    constraint_sets : list
+        One straindesign constraints argument per FVA (e.g. module[CONSTRAINTS]).
+    solver : str, optional
+    processes : int, optional
+        Number of worker processes. With 1 the chunks are solved in this
+        process. If None, straindesign.fva is called for each constraint set,
+        or the chunks are solved in this process if reaction_subsets is given.
+    chunk_size : int
+        LPs per task.
+    reaction_subsets : list, optional
+        One list of reaction ids per constraint set, only these reactions are
+        solved. Defaults to all reactions.
+
+    Returns
+    -------
+    list of pandas.DataFrame
+        ``minimum``/``maximum`` flux per reaction, in the order of constraint_sets.
+    """
+    solver = select_solver(solver, model)
+    if processes is None and reaction_subsets is None:
+        return [fva(model, solver=solver, constraints=c) for c in constraint_sets]
+    if processes is None:
+        processes = 1
+
+    reaction_ids = model.reactions.list_attr('id')
+    if reaction_subsets is None:
+        reaction_subsets = [reaction_ids] * len(constraint_sets)
+    position = {r: j for j, r in enumerate(reaction_ids)}
+    lps = [fva_lp(model, c) for c in constraint_sets]
+    results = [None] * len(lps)
+    slots = [None] * len(lps)
+    tasks = []
+    for module, lp_matrices in enumerate(lps):
+        subset = reaction_subsets[module]
+        if not subset:
+            results[module] = _to_frame([], [])
+            continue
+        _, _, status = _build_lp(lp_matrices, solver).solve()
+        if status not in [OPTIMAL, UNBOUNDED]:
+            log.error('FVA problem not feasible.')
+            results[module] = _to_frame([np.nan] * 2 * len(subset), subset)
+            continue
+        # straindesign.fva maximizes reaction j with LP index 2j and minimizes it with 2j+1
+        lp_indices = [i for r in subset for i in (2 * position[r], 2 * position[r] + 1)]
+        slots[module] = {i: k for k, i in enumerate(lp_indices)}
+        results[module] = [np.nan] * len(lp_indices)
+        tasks.extend((module, lp_indices[i:i + chunk_size]) for i in range(0, len(lp_indices), chunk_size))
+
+    log.info(f'  {len(tasks)} FVA tasks over {processes} processes.')
+    if processes <= 1:
+        _worker_init(lps, solver)
+        for module, indices, values in map(_worker_solve, tasks):
+            for i, v in zip(indices, values):
+                results[module][slots[module][i]] = v
+    else:
+        with SDPool(processes, initializer=_worker_init, initargs=(lps, solver)) as pool:
+            for module, indices, values in pool.imap_unordered(_worker_solve, tasks):
+                for i, v in zip(indices, values):
+                    results[module][slots[module][i]] = v
+    return [
+        r if isinstance(r, DataFrame) else _to_frame(r, reaction_subsets[module])
+        for module, r in enumerate(results)
+    ]
@@ -0,0 +1,228 @@
+"""
+Strain design enumeration split over disjoint parts of the candidate space.
+
+One SDMILP enumerating over every knockout candidate runs on one node. With k
+branch reactions (e.g. CYTBD4cm and NDHPQRcm, which split the sucrose designs
+of run_strain_design.py), the candidate space splits into 2^k disjoint parts,
+each forcing or forbidding the knockout of every branch reaction. Every part is
+an independent MILP on the same preprocessed problem.
+
+The parts are handed out through a folder used as a queue, so workers can be
+local processes or processes on other hosts that share the folder:
+
+    queue_dir/state.pkl        preprocessed_state() of the StrainDesign
+    queue_dir/run.pkl          arguments of the MILPs
+    queue_dir/tasks/<n>.pkl    parts not taken yet
+    queue_dir/claimed/<n>.pkl  parts a worker took (renamed from tasks/, so only one worker gets each)
+    queue_dir/results/<n>.pkl  status and compressed solutions of a part
+
+The compressed solutions of all parts are merged, duplicates and designs that
+contain another design (possible in parts that force a knockout) are dropped,
+and the rest is decompressed once.
+
+    python -m syn_elong.partitioned_design <queue_dir>
+"""
+import itertools
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import time
+
+import numpy as np
+from straindesign.names import ANY, BEST, INFEASIBLE, OPTIMAL, POPULATE, TIME_LIMIT, TIME_LIMIT_W_SOL
+
+from syn_elong import cache
+from syn_elong.strain_design_simplified import StrainDesign
+
+log = logging.getLogger(__name__)
+
+
+def partitions(branch_reactions):
+    """ Every combination of forcing (True) or forbidding (False) the knockout of the branch reactions. """
+    return [
+        dict(zip(branch_reactions, knocked_out))
+        for knocked_out in itertools.product([True, False], repeat=len(branch_reactions))
+    ]
+
+
+class FileQueue(object):
+    def __init__(self, queue_dir):
+        self.queue_dir = queue_dir
+        for sub_dir in ['tasks', 'claimed', 'results']:
+            os.makedirs(os.path.join(queue_dir, sub_dir), exist_ok=True)
+
+    def _path(self, sub_dir, name):
+        return os.path.join(self.queue_dir, sub_dir, name)
+
+    def put(self, task_id, task):
+        cache.dump(task, self._path('tasks', f'{task_id}.pkl'))
+
+    def claim(self):
+        """ (task id, task) of a task no other worker took, None when there is none left. """
+        for name in sorted(os.listdir(os.path.join(self.queue_dir, 'tasks'))):
+            if not name.endswith('.pkl'):
+                continue
+            try:
+                # rename is atomic, only one worker moves the file
+                os.rename(self._path('tasks', name), self._path('claimed', name))
+            except FileNotFoundError:
+                continue
+            return name[:-len('.pkl')], cache.load(self._path('claimed', name))
+        return None
+
+    def complete(self, task_id, result):
+        cache.dump(result, self._path('results', f'{task_id}.pkl'))
+
+    def results(self):
+        """ {task id: result} of the finished tasks. """
+        results = {}
+        for name in os.listdir(os.path.join(self.queue_dir, 'results')):
+            if name.endswith('.pkl'):
+                results[name[:-len('.pkl')]] = cache.load(self._path('results', name))
+        return results
+
+
+def solve_partition(sd_helper, partition, max_solutions, time_limit, max_cost, solution_approach):
+    """ Status, compressed solutions and MILP setup of one part of the candidate space. """
+    sd_milp = sd_helper.build_milp(max_cost, partition)
+    compute = {ANY: sd_milp.compute, BEST: sd_milp.compute_optimal, POPULATE: sd_milp.enumerate}[solution_approach]
+    milp_solution = compute(show_no_ki=True, max_solutions=max_solutions, time_limit=time_limit)
+    cmp_sd = []
+    if milp_solution.status in [OPTIMAL, TIME_LIMIT_W_SOL]:
+        cmp_sd = milp_solution.get_reaction_sd_mark_no_ki()
+    return {'status': milp_solution.status, 'cmp_sd': cmp_sd, 'sd_setup': milp_solution.sd_setup}
+
+
+def work(queue_dir):
+    """ Solve parts from the queue until none are left. """
+    file_queue = FileQueue(queue_dir)
+    sd_helper = StrainDesign.from_state(cache.load(os.path.join(queue_dir, 'state.pkl')))
+    run_kwargs = cache.load(os.path.join(queue_dir, 'run.pkl'))
+    while True:
+        claimed = file_queue.claim()
+        if claimed is None:
+            return
+        task_id, partition = claimed
+        log.info(f'  Solving part {task_id}: {partition}')
+        start = time.perf_counter()
+        try:
+            result = solve_partition(sd_helper, partition, **run_kwargs)
+        except Exception as e:
+            result = {'status': None, 'error': repr(e), 'cmp_sd': [], 'sd_setup': None}
+        result.update({'partition': partition, 'time': time.perf_counter() - start, 'host': socket.gethostname()})
+        file_queue.complete(task_id, result)
+
+
+def _minimal(cmp_sd):
+    """ Distinct solutions without the ones that contain the interventions of another solution. """
+    unique = {}
+    for s in cmp_sd:
+        unique.setdefault(frozenset(s.items()), s)
+    interventions = {key: frozenset(k for k, v in key if v != 0) for key in unique}
+    return [
+        s for key, s in unique.items()
+        if not any(other < interventions[key] for other in interventions.values())
+    ]
+
+
+def merged_status(statuses, num_solutions):
+    """ Status of the whole candidate space from the statuses of its parts. """
+    if any(s in [TIME_LIMIT, TIME_LIMIT_W_SOL] for s in statuses):
+        return TIME_LIMIT_W_SOL if num_solutions else TIME_LIMIT
+    if all(s in [OPTIMAL, INFEASIBLE] for s in statuses):
+        return OPTIMAL if num_solutions else INFEASIBLE
+    return statuses[0]
+
+
+def run_partitioned(sd_helper, branch_reactions, processes=None, queue_dir=None, max_solutions=5, time_limit=60,
+                    max_cost=np.inf, solution_approach=ANY, poll_interval=1):
+    """
+    Strain designs of a StrainDesign, enumerated on disjoint parts of its knockout candidates.
+
+    Parameters
+    ----------
+    sd_helper : StrainDesign
+    branch_reactions : list of str
+        Knockout candidates (reactions of the original model) to split the candidate space on, 2^k parts.
+    processes : int, optional
+        Number of local worker processes. If None, the parts are solved one after the other in this process. With 0,
+        only workers started on other hosts (python -m syn_elong.partitioned_design <queue_dir>) solve them.
+    queue_dir : str, optional
+        Folder of the queue, shared with the other hosts. Defaults to a temporary folder.
+    max_solutions, time_limit, max_cost, solution_approach :
+        As for StrainDesign.run(), max_solutions and time_limit apply to every part.
+    poll_interval : float
+        Seconds between checks for finished parts.
+
+    Returns
+    -------
+    SDSolutions
+    """
+    parts = []
+    for partition in partitions(branch_reactions):
+        compressed = {}
+        for reac_id, knocked_out in partition.items():
+            cmp_id = sd_helper.compressed_reaction_id(reac_id)
+            if cmp_id not in sd_helper.compressed_ko_cost:
+                raise Exception(f'{reac_id} is no knockout candidate of the compressed strain design problem.')
+            if compressed.setdefault(cmp_id, knocked_out) != knocked_out:
+                # two branch reactions lumped into one, forcing one and forbidding the other leaves nothing
+                break
+        else:
+            parts.append(compressed)
+    run_kwargs = {
+        'max_solutions': max_solutions, 'time_limit': time_limit, 'max_cost': max_cost,
+        'solution_approach': solution_approach,
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        if queue_dir is None:
+            queue_dir = tmp
+        file_queue = FileQueue(queue_dir)
+        if file_queue.results() or os.listdir(os.path.join(queue_dir, 'tasks')):
+            raise Exception(f'Queue folder {queue_dir} holds tasks or results of another run.')
+        cache.dump(sd_helper.preprocessed_state(), os.path.join(queue_dir, 'state.pkl'))
+        cache.dump(run_kwargs, os.path.join(queue_dir, 'run.pkl'))
+        for i, partition in enumerate(parts):
+            file_queue.put(f'{i:04d}', partition)
+        log.info(f'Solving {len(parts)} parts of the candidate space.')
+        workers = []
+        if processes is None:
+            work(queue_dir)
+        else:
+            context = multiprocessing.get_context('spawn')
+            workers = [context.Process(target=work, args=(queue_dir,), daemon=True) for _ in range(processes)]
+            for w in workers:
+                w.start()
+        try:
+            while True:
+                results = file_queue.results()
+                if len(results) == len(parts):
+                    break
+                if processes is None or workers and not any(w.is_alive() for w in workers):
+                    if len(file_queue.results()) < len(parts):
+                        raise Exception(f'Workers exited with {len(parts) - len(results)} parts unsolved, see '
+                                        f'{queue_dir}/claimed.')
+                time.sleep(poll_interval)
+        finally:
+            for w in workers:
+                if w.is_alive():
+                    w.terminate()
+                w.join()
+    for result in results.values():
+        if 'error' in result:
+            raise Exception(f"Part {result['partition']} failed: {result['error']}")
+        log.info(f"  Part {result['partition']}: {result['status']}, {len(result['cmp_sd'])} MILP solutions in "
+                 f"{result['time']:.1f} s on {result['host']}.")
+    results = [results[task_id] for task_id in sorted(results)]
+    cmp_sd = _minimal([s for result in results for s in result['cmp_sd']])
+    designs = sd_helper.decompress(cmp_sd, max_cost)
+    status = merged_status([result['status'] for result in results], len(cmp_sd))
+    return sd_helper.to_sd_solutions(designs.to_list(), status, results[0]['sd_setup'])
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    work(sys.argv[1])
@@ -0,0 +1,111 @@
+"""
+Incremental model build pipeline.
+
+Each update function is a stage that takes a model and returns the updated
+model. After a stage runs its output is checkpointed (pickled) under a key
+built from the key of its input model and the stage's source code. Keys are
+chained, so the key of a stage's input is itself a hash of the starting model
+and every upstream stage. On a rerun, the pipeline resumes from the last stage
+whose checkpoint exists; editing one stage only rebuilds from that stage on.
+"""
+import inspect
+import logging
+import pathlib
+import types
+
+from syn_elong import cache
+
+log = logging.getLogger(__name__)
+
+
+def _referenced_functions(func):
+    """ Functions from the syn_elong package referenced by name inside func. """
+    names = set()
+    code_objects = [func.__code__]
+    while code_objects:
+        code = code_objects.pop()
+        names.update(code.co_names)
+        code_objects.extend(c for c in code.co_consts if isinstance(c, types.CodeType))
+    found = []
+    for name in sorted(names):
+        obj = func.__globals__.get(name)
+        if inspect.isfunction(obj) and obj.__module__.startswith('syn_elong'):
+            found.append(obj)
+    return found
+
+
+def stage_fingerprint(func):
+    """
+    Source code of a stage plus every syn_elong helper it (transitively) calls.
+
+    Data files a stage reads can be listed in a ``data_files`` attribute on
+    the function; their content hashes become part of the fingerprint. Other
+    data (e.g. the universal store) can be covered by functions returning a
+    hash of it, listed in a ``data_hashes`` attribute.
+    """
+    seen = {}
+    to_visit = [func]
+    while to_visit:
+        f = to_visit.pop()
+        name = f'{f.__module__}.{f.__qualname__}'
+        if name in seen:
+            continue
+        seen[name] = inspect.getsource(f)
+        to_visit.extend(_referenced_functions(f))
+    parts = [f'{name}\n{seen[name]}' for name in sorted(seen)]
+    parts.extend(cache.file_hash(p) for p in getattr(func, 'data_files', ()))
+    parts.extend(h() for h in getattr(func, 'data_hashes', ()))
+    return cache.text_hash(*parts)
+
+
+def stage_keys(input_key, stages):
+    """ Chained checkpoint key for the output of every stage. """
+    keys = []
+    key = input_key
+    for stage in stages:
+        key = cache.text_hash(key, stage_fingerprint(stage))
+        keys.append(key)
+    return keys
+
+
+def run_pipeline(load_input, input_key, stages, checkpoint_dir=None):
+    """
+    Run the stages, reusing checkpointed outputs where possible.
+
+    Parameters
+    ----------
+    load_input : callable
+        Returns the starting model; only called if no checkpoint can be reused.
+    input_key : str
+        Hash identifying the starting model (e.g. the hash of its SBML file).
+    stages : list of callable
+        Update functions, applied in order.
+    checkpoint_dir : str, optional
+        Where checkpoints are stored. Defaults to the ``pipeline`` cache folder.
+
+    Returns
+    -------
+    cobra.Model
+    """
+    if checkpoint_dir is None:
+        checkpoint_dir = cache.cache_dir('pipeline')
+    checkpoint_dir = pathlib.Path(checkpoint_dir)
+    keys = stage_keys(input_key, stages)
+    paths = [checkpoint_dir.joinpath(f'{stage.__name__}.{key}.pkl') for stage, key in zip(stages, keys)]
+
+    start = 0
+    model = None
+    for i in reversed(range(len(stages))):
+        model = cache.load(paths[i])
+        if model is not None:
+            log.info(f"Reusing checkpoint after {stages[i].__name__}")
+            start = i + 1
+            break
+    if model is None:
+        model = load_input()
+
+    for stage, path in zip(stages[start:], paths[start:]):
+        log.info(f"Running {stage.__name__}")
+        model = stage(model)
+        cache.dump(model, path)
+    return model
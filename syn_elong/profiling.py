@@ -0,0 +1,91 @@
+"""
+Phase-level timing and memory records.
+
+A PhaseProfiler records, for every ``with profiler.phase(name):`` block, the
+wall time, the CPU time of the process, the peak RSS of the process at the end
+of the phase and any problem sizes attached to it. With a ``profile_dir``, each
+phase is also run under cProfile and dumped to ``<profile_dir>/<n>_<name>.prof``
+(readable with ``pstats`` or snakeviz). Only one cProfile can run at a time, so
+phases that start while another one is profiled (nested phases, or phases of
+another thread) are timed but not profiled.
+"""
+import cProfile
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+def peak_rss_mb():
+    """ Peak resident set size of this process in MB. """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kB on linux
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+class PhaseProfiler(object):
+    def __init__(self, profile_dir=None):
+        self.profile_dir = profile_dir
+        self.phases = []
+        self._lock = threading.Lock()
+        self._profiling = False
+
+    @contextmanager
+    def phase(self, name, **sizes):
+        """
+        Record a phase. Yields the dict of the record, so sizes only known at the end can be added to
+        record['sizes'].
+        """
+        record = {'phase': name, 'sizes': dict(sizes)}
+        profiler = None
+        if self.profile_dir is not None:
+            with self._lock:
+                if not self._profiling:
+                    profiler = cProfile.Profile()
+                    self._profiling = True
+        wall, cpu, rss = time.perf_counter(), time.process_time(), peak_rss_mb()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+            record.update({
+                'wall_time': time.perf_counter() - wall,
+                'cpu_time': time.process_time() - cpu,
+                'peak_rss_mb': peak_rss_mb(),
+                'peak_rss_increase_mb': peak_rss_mb() - rss,
+            })
+            with self._lock:
+                index = len(self.phases)
+                self.phases.append(record)
+            if profiler is not None:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                record['profile'] = os.path.join(self.profile_dir, f'{index:02d}_{name}.prof')
+                profiler.dump_stats(record['profile'])
+
+    def totals(self):
+        """ Wall and CPU time summed per phase name, for phases that occur several times. """
+        totals = {}
+        for record in self.phases:
+            total = totals.setdefault(record['phase'], {'count': 0, 'wall_time': 0.0, 'cpu_time': 0.0})
+            total['count'] += 1
+            total['wall_time'] += record['wall_time']
+            total['cpu_time'] += record['cpu_time']
+        return totals
+
+    def to_dict(self):
+        return {'phases': list(self.phases), 'totals': self.totals(), 'peak_rss_mb': peak_rss_mb()}
+
+    def to_json(self, file_path=None):
+        """ Records as json, written to file_path if given. """
+        text = json.dumps(self.to_dict(), indent=2, default=str)
+        if file_path is not None:
+            with open(file_path, 'w') as f:
+                f.write(text)
+        return text
@@ -0,0 +1,194 @@
+"""
+Declarative reaction additions.
+
+A spec is a folder of four csv tables:
+
+metabolites.csv
+    id, name, formula, compartment of metabolites new to the model
+reactions.csv
+    id, name, subsystem, lower_bound, upper_bound of reactions to add
+stoichiometry.csv
+    reaction, metabolite, coefficient (negative for substrates)
+gpr.csv
+    reaction, gene_reaction_rule for new or existing reactions
+
+``apply_spec`` validates the tables against the model and then adds all
+metabolites and all reactions with one ``add_metabolites`` and one
+``add_reactions`` call, so the solver interface is updated once instead of
+once per reaction. GPR rules are assigned afterwards in a single pass.
+"""
+import logging
+import pathlib
+
+import pandas as pd
+from cobra import Metabolite, Reaction
+
+log = logging.getLogger(__name__)
+
+_tables = {
+    'metabolites': ['id', 'name', 'formula', 'compartment'],
+    'reactions': ['id', 'name', 'subsystem', 'lower_bound', 'upper_bound'],
+    'stoichiometry': ['reaction', 'metabolite', 'coefficient'],
+    'gpr': ['reaction', 'gene_reaction_rule'],
+}
+
+
+def spec_files(spec_dir):
+    """ Paths of the csv tables that make up a spec. """
+    spec_dir = pathlib.Path(spec_dir)
+    return [spec_dir.joinpath(f'{name}.csv') for name in _tables]
+
+
+def load_spec(spec_dir):
+    """
+    Read the spec tables from a folder.
+
+    Parameters
+    ----------
+    spec_dir : str
+
+    Returns
+    -------
+    dict of pandas.DataFrame
+        Keyed by table name.
+    """
+    spec = {}
+    for name, path in zip(_tables, spec_files(spec_dir)):
+        spec[name] = pd.read_csv(path, dtype=str, keep_default_na=False)
+    for column in ['lower_bound', 'upper_bound']:
+        spec['reactions'][column] = pd.to_numeric(spec['reactions'][column], errors='coerce')
+    spec['stoichiometry']['coefficient'] = pd.to_numeric(
+        spec['stoichiometry']['coefficient'], errors='coerce'
+    )
+    return spec
+
+
+def validate_spec(model, spec):
+    """
+    Check a spec can be applied to a model.
+
+    Raises
+    ------
+    ValueError
+        Listing every problem found.
+    """
+    errors = []
+    for name, columns in _tables.items():
+        missing = set(columns).difference(spec[name].columns)
+        if missing:
+            errors.append(f"{name} table is missing columns {sorted(missing)}")
+    if errors:
+        raise ValueError('\n'.join(errors))
+
+    reactions = spec['reactions']
+    metabolites = spec['metabolites']
+    stoichiometry = spec['stoichiometry']
+
+    for name, table, column in [('reaction', reactions, 'id'), ('metabolite', metabolites, 'id')]:
+        duplicated = sorted(set(table.loc[table[column].duplicated(), column]))
+        if duplicated:
+            errors.append(f"duplicated {name} ids {duplicated}")
+
+    new_reactions = set(reactions.id)
+    existing = sorted(new_reactions.intersection(r.id for r in model.reactions))
+    if existing:
+        errors.append(f"reactions already in model {existing}")
+
+    bad_bounds = reactions[
+        reactions.lower_bound.isna() | reactions.upper_bound.isna() |
+        (reactions.lower_bound > reactions.upper_bound)
+    ]
+    if len(bad_bounds):
+        errors.append(f"invalid bounds for {sorted(bad_bounds.id)}")
+
+    unknown = sorted(set(stoichiometry.reaction).difference(new_reactions))
+    if unknown:
+        errors.append(f"stoichiometry for reactions not in reactions table {unknown}")
+    no_metabolites = sorted(new_reactions.difference(stoichiometry.reaction))
+    if no_metabolites:
+        errors.append(f"reactions without stoichiometry {no_metabolites}")
+    known_metabolites = set(metabolites.id).union(m.id for m in model.metabolites)
+    unknown = sorted(set(stoichiometry.metabolite).difference(known_metabolites))
+    if unknown:
+        errors.append(f"metabolites neither in model nor metabolites table {unknown}")
+    if stoichiometry.coefficient.isna().any() or (stoichiometry.coefficient == 0).any():
+        bad = stoichiometry[stoichiometry.coefficient.isna() | (stoichiometry.coefficient == 0)]
+        errors.append(f"missing or zero coefficients for {sorted(set(bad.reaction))}")
+    if stoichiometry.duplicated(['reaction', 'metabolite']).any():
+        bad = stoichiometry[stoichiometry.duplicated(['reaction', 'metabolite'])]
+        errors.append(f"metabolites listed twice for {sorted(set(bad.reaction))}")
+
+    unknown = sorted(set(spec['gpr'].reaction).difference(new_reactions.union(r.id for r in model.reactions)))
+    if unknown:
+        errors.append(f"gpr rules for reactions neither in model nor reactions table {unknown}")
+
+    if errors:
+        raise ValueError('\n'.join(errors))
+
+
+def build_reactions(model, spec):
+    """
+    cobra objects for a spec.
+
+    Returns
+    -------
+    list of cobra.Metabolite
+        Metabolites of the spec that are not in the model yet.
+    list of cobra.Reaction
+        New reactions, pointing at model metabolites where they exist.
+    """
+    new_metabolites = {}
+    for row in spec['metabolites'].itertuples(index=False):
+        if row.id in model.metabolites:
+            log.info(f"{row.id} already in model, using existing metabolite")
+            continue
+        new_metabolites[row.id] = Metabolite(
+            row.id, formula=row.formula, name=row.name, compartment=row.compartment
+        )
+
+    def get_metabolite(met_id):
+        if met_id in new_metabolites:
+            return new_metabolites[met_id]
+        return model.metabolites.get_by_id(met_id)
+
+    stoichiometry = {}
+    for row in spec['stoichiometry'].itertuples(index=False):
+        stoichiometry.setdefault(row.reaction, {})[get_metabolite(row.metabolite)] = float(row.coefficient)
+
+    reactions = []
+    for row in spec['reactions'].itertuples(index=False):
+        reaction = Reaction(row.id)
+        reaction.name = row.name
+        reaction.subsystem = row.subsystem
+        reaction.lower_bound = float(row.lower_bound)
+        reaction.upper_bound = float(row.upper_bound)
+        reaction.add_metabolites(stoichiometry[row.id])
+        reactions.append(reaction)
+    return list(new_metabolites.values()), reactions
+
+
+def apply_spec(model, spec):
+    """
+    Validate a spec and add its metabolites, reactions and GPR rules to a model.
+
+    Parameters
+    ----------
+    model : cobra.Model
+    spec : str or dict of pandas.DataFrame
+        Spec folder or tables returned by ``load_spec``.
+
+    Returns
+    -------
+    cobra.Model
+    """
+    if not isinstance(spec, dict):
+        spec = load_spec(spec)
+    validate_spec(model, spec)
+    metabolites, reactions = build_reactions(model, spec)
+    model.add_metabolites(metabolites)
+    model.add_reactions(reactions)
+    for row in spec['gpr'].itertuples(index=False):
+        model.reactions.get_by_id(row.reaction).gene_reaction_rule = row.gene_reaction_rule
+    log.info(f"Added {len(metabolites)} metabolites, {len(reactions)} reactions "
+             f"and {len(spec['gpr'])} gpr rules")
+    return model
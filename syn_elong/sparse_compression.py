@@ -0,0 +1,274 @@
+"""
+Network compression on the sparse stoichiometric matrix.
+
+straindesign's compress_model converts every coefficient of the cobra model to
+a sympy Rational, computes the rational nullspace with efmtool for every
+coupled-reaction step, rescales and merges cobra reactions one by one and
+recomputes the conservation relations after every step. compress_model_sparse
+keeps the network as sparse columns of exact fractions (scipy.sparse has no
+exact rational dtype) and only writes the result back to the cobra model once.
+
+Coupled reactions are found locally: a metabolite that only one reaction
+touches blocks that reaction, and a metabolite that exactly two reactions
+touch fixes the ratio of their fluxes, so they are lumped. Repeated until
+nothing changes, this lumps the linear pathways that make up most of the
+efmtool subsets; couplings that only show in the nullspace (e.g. through
+cycles) stay unlumped, which is correct but compresses a bit less. Parallel
+reactions are lumped as in compress_model_parallel. The compression map has the
+same structure as the one of compress_model, so compress_modules,
+compress_ki_ko_cost and expand_sd work unchanged.
+"""
+import logging
+from fractions import Fraction
+
+import numpy as np
+from cobra import Reaction
+from sympy import Rational
+
+
+def _fraction(v):
+    """ Exact fraction of a coefficient, floats are read as written in base 10 like nsimplify(..., 'base10'). """
+    if isinstance(v, int):
+        return Fraction(v)
+    if isinstance(v, float):
+        return Fraction(repr(v))
+    return Fraction(int(v.p), int(v.q))
+
+
+def _lumped_id(ids):
+    # the naming of straindesign's compression
+    new_id = ids[0]
+    for reac_id in ids[1:]:
+        if len(new_id) + len(reac_id) < 220 and new_id[-3:] != '...':
+            new_id += '*' + reac_id
+        elif not new_id[-3:] == '...':
+            new_id += '...'
+    return new_id
+
+
+def _scaled_bounds(lb, ub, k):
+    """ Bounds of lambda when lb <= k * lambda <= ub. """
+    lo, hi = (lb / k, ub / k) if k > 0 else (ub / k, lb / k)
+    return float(lo) + 0.0, float(hi) + 0.0
+
+
+class _Reaction(object):
+    __slots__ = ['id', 'col', 'lb', 'ub', 'obj', 'source', 'changed']
+
+    def __init__(self, reac_id, col, lb, ub, obj, source, changed=False):
+        self.id = reac_id
+        self.col = col  # {metabolite index: Fraction}
+        self.lb = lb
+        self.ub = ub
+        self.obj = obj
+        self.source = source  # id of the cobra reaction it started from
+        self.changed = changed
+
+
+class SparseNetwork(object):
+    def __init__(self, met_ids, reactions):
+        self.met_ids = met_ids
+        self.reactions = reactions
+
+    @classmethod
+    def from_model(cls, model):
+        met_index = {m.id: i for i, m in enumerate(model.metabolites)}
+        reactions = [
+            _Reaction(r.id, {met_index[m.id]: _fraction(v) for m, v in r._metabolites.items() if v != 0},
+                      r.lower_bound, r.upper_bound, _fraction(r.objective_coefficient), r.id)
+            for r in model.reactions
+        ]
+        return cls([m.id for m in model.metabolites], reactions)
+
+    def _rows(self):
+        rows = {}
+        for j, r in enumerate(self.reactions):
+            for m in r.col:
+                rows.setdefault(m, set()).add(j)
+        return rows
+
+    def lump_coupled(self):
+        """ Remove dead-end reactions and lump reactions coupled by a metabolite, returns the step's map. """
+        reactions = self.reactions
+        rows = self._rows()
+        # members[j]: {index of a reaction before this step: factor of its flux in the flux of j}
+        members = {j: {j: Fraction(1)} for j in range(len(reactions))}
+        alive = set(range(len(reactions)))
+
+        def block(j):
+            for m in reactions[j].col:
+                rows[m].discard(j)
+                worklist.add(m)
+            alive.discard(j)
+
+        worklist = set(rows)
+        while worklist:
+            m = worklist.pop()
+            rs = rows.get(m, ())
+            if len(rs) == 1:
+                block(next(iter(rs)))
+            elif len(rs) == 2:
+                a, b = sorted(rs)
+                ra, rb = reactions[a], reactions[b]
+                # flux of b = k * flux of a, so that m is balanced
+                k = -ra.col[m] / rb.col[m]
+                col = dict(ra.col)
+                for n, v in rb.col.items():
+                    col[n] = col.get(n, 0) + k * v
+                    rows[n].discard(b)
+                    worklist.add(n)
+                for n in ra.col:
+                    worklist.add(n)
+                col = {n: v for n, v in col.items() if v != 0}
+                for n in ra.col.keys() - col.keys():
+                    rows[n].discard(a)
+                for n in col:
+                    rows.setdefault(n, set()).add(a)
+                lo, hi = _scaled_bounds(rb.lb, rb.ub, k)
+                reactions[a] = _Reaction(ra.id, col, max(ra.lb, lo), min(ra.ub, hi), ra.obj + k * rb.obj, ra.source,
+                                         changed=True)
+                members[a].update({i: f * k for i, f in members.pop(b).items()})
+                alive.discard(b)
+                if reactions[a].lb == 0 and reactions[a].ub == 0:
+                    block(a)
+        return self._apply(sorted(alive), members)
+
+    def lump_parallel(self, protected):
+        """ Lump reactions with the same (or opposite) stoichiometry and direction, returns the step's map. """
+        groups = {}
+        members = {}
+        for j, r in enumerate(self.reactions):
+            if r.id in protected:
+                members[j] = {j: Fraction(1)}
+                continue
+            first = r.col[min(r.col)] if r.col else 1
+            fwd = np.isinf(r.ub) and first > 0 or np.isinf(r.lb) and first < 0
+            rev = np.isinf(r.lb) and first > 0 or np.isinf(r.ub) and first < 0
+            # reactions with other bounds than 0 and +/-inf are not lumped
+            homogeneous = r.lb in (0, -np.inf) and r.ub in (0, np.inf)
+            key = (tuple(sorted((m, v * first) for m, v in r.col.items())), fwd, rev, None if homogeneous else j)
+            if key in groups:
+                members[groups[key]][j] = Fraction(1)
+            else:
+                groups[key] = j
+                members[j] = {j: Fraction(1)}
+        for j, lumped in members.items():
+            if len(lumped) > 1:
+                r = self.reactions[j]
+                self.reactions[j] = _Reaction(r.id, r.col, r.lb, r.ub, sum(self.reactions[i].obj for i in lumped),
+                                              r.source, changed=True)
+        return self._apply(sorted(members), members)
+
+    def _apply(self, kept, members):
+        """ Keep the given reactions, named after their members, and return {new id: {old id: factor}}. """
+        old_ids = [r.id for r in self.reactions]
+        reac_map_exp = {}
+        reactions = []
+        for j in kept:
+            lumped = sorted(members[j])
+            r = self.reactions[j]
+            r.id = _lumped_id([old_ids[i] for i in lumped])
+            reac_map_exp[r.id] = {old_ids[i]: Rational(members[j][i].numerator, members[j][i].denominator)
+                                  for i in lumped}
+            reactions.append(r)
+        self.reactions = reactions
+        return reac_map_exp
+
+    def dependent_metabolites(self):
+        """ Metabolites whose rows are linear combinations of earlier rows (conservation relations). """
+        rows = {}
+        for j, r in enumerate(self.reactions):
+            for m, v in r.col.items():
+                rows.setdefault(m, {})[j] = v
+        pivots = []  # (column, row with 1 in column), in the order they were found
+        dependent = []
+        for m in range(len(self.met_ids)):
+            row = dict(rows.get(m, {}))
+            for c, pivot_row in pivots:
+                v = row.get(c)
+                if v:
+                    for n, w in pivot_row.items():
+                        row[n] = row.get(n, 0) - v * w
+                    row = {n: w for n, w in row.items() if w != 0}
+            if not row:
+                dependent.append(m)
+                continue
+            c = min(row)
+            pivots.append((c, {n: w / row[c] for n, w in row.items()}))
+        return dependent
+
+    def write_back(self, model):
+        """ Replace the reactions of the cobra model that changed and remove unused and dependent metabolites. """
+        kept = {r.source for r in self.reactions if not r.changed}
+        model.remove_reactions([r for r in model.reactions if r.id not in kept])
+        new_reactions = []
+        objective = {}
+        for r in self.reactions:
+            if not r.changed:
+                continue
+            # bounds divided by the lumping factors can cross by a rounding error
+            reaction = Reaction(r.id, lower_bound=min(r.lb, r.ub), upper_bound=r.ub)
+            reaction.add_metabolites({
+                model.metabolites.get_by_id(self.met_ids[m]): float(v) for m, v in r.col.items()
+            })
+            new_reactions.append(reaction)
+            if r.obj:
+                objective[r.id] = float(r.obj)
+        model.add_reactions(new_reactions)
+        for reac_id, c in objective.items():
+            model.reactions.get_by_id(reac_id).objective_coefficient = c
+        # as compress_model_efmtool, the compressed model has no gene rules
+        for reaction in model.reactions:
+            if reaction.gene_reaction_rule:
+                reaction.gene_reaction_rule = ''
+        dependent = {self.met_ids[m] for m in self.dependent_metabolites()}
+        model.remove_metabolites([m for m in model.metabolites if not m.reactions or m.id in dependent])
+
+
+def compress_model_sparse(model, no_par_compress_reacs=set()):
+    """
+    Compress a metabolic model like straindesign.networktools.compress_model, on a sparse matrix of fractions.
+
+    Blocked reactions are removed, then coupled and parallel reactions are lumped alternately until a step does not
+    reduce the number of reactions. The reactions in no_par_compress_reacs are not lumped in parallel.
+
+    Returns
+    -------
+    list of dict
+        The compression map, as returned by compress_model.
+    """
+    no_par_compress_reacs = set(no_par_compress_reacs)
+    logging.info('  Removing blocked reactions.')
+    model.remove_reactions([r for r in model.reactions if r.bounds == (0, 0)])
+    network = SparseNetwork.from_model(model)
+    parallel = False
+    run = 1
+    cmp_map_reac = []
+    numr = len(network.reactions)
+    while True:
+        if not parallel:
+            logging.info(f'  Compression {run}: Lumping coupled reactions.')
+            reac_map_exp = network.lump_coupled()
+            for new_reac, old_reac_val in reac_map_exp.items():
+                old_reacs_no_compress = [r for r in no_par_compress_reacs if r in old_reac_val]
+                if old_reacs_no_compress:
+                    no_par_compress_reacs.difference_update(old_reacs_no_compress)
+                    no_par_compress_reacs.add(new_reac)
+        else:
+            logging.info(f'  Compression {run}: Lumping parallel reactions.')
+            reac_map_exp = network.lump_parallel(no_par_compress_reacs)
+        if numr > len(reac_map_exp):
+            logging.info(f'  Reduced to {len(reac_map_exp)} reactions.')
+            cmp_map_reac.append({
+                'reac_map_exp': reac_map_exp,
+                'parallel': parallel,
+            })
+            parallel = not parallel
+            run += 1
+            numr = len(reac_map_exp)
+        else:
+            logging.info(f'  Last step could not reduce size further ({numr} reactions).')
+            logging.info(f'  Network compression completed. ({run - 1} compression iterations)')
+            break
+    network.write_back(model)
+    return cmp_map_reac
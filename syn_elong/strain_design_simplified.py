@@ -21,22 +21,54 @@
 
 from contextlib import redirect_stdout, redirect_stderr
 import numpy as np
+import pandas as pd
+from scipy import sparse
 import json
 import io
+import os
 from copy import deepcopy
 import logging
+import multiprocessing
+import queue
+import tempfile
+import threading
+import time
+from importlib.metadata import version
 from cobra import Model
 from cobra.manipulation import rename_genes
-from straindesign import SDModule, SDSolutions, select_solver, fva, DisableLogger, SDMILP
+from straindesign import SDModule, SDSolutions, select_solver, fva, DisableLogger, SDMILP, avail_solvers
 from straindesign.names import *
 from straindesign.networktools import   remove_ext_mets, remove_dummy_bounds, bound_blocked_or_irrevers_fva, \
-                                        remove_irrelevant_genes, extend_model_gpr, extend_model_regulatory, \
-                                        compress_model, compress_modules, compress_ki_ko_cost, expand_sd, filter_sd_maxcost
+                                        extend_model_regulatory, \
+                                        compress_model, compress_modules, compress_ki_ko_cost
+from syn_elong import cache, gpr, sparse_compression
+from syn_elong.factored_designs import FactoredDesigns
+from syn_elong.gpr import compile_gpr, extend_model_gpr, remove_irrelevant_genes
+from syn_elong.model_diff import model_hash
+from syn_elong.model_snapshot import ModelSnapshot
+from syn_elong.parallel_fva import fva_modules
+from syn_elong.profiling import PhaseProfiler
+
+# everything steps() computes that is needed to build the MILP and decompress its solutions
+_preprocessed_attributes = [
+    'big_M', 'gene_kos', 'has_gene_names', 'ko_cost', 'ki_cost', 'gko_cost', 'gki_cost', 'reg_cost',
+    'uncompressed_ko_cost', 'uncompressed_ki_cost', 'uncompressed_gko_cost', 'uncompressed_gki_cost',
+    'uncompressed_reg_cost', 'orig_ko_cost', 'orig_ki_cost', 'orig_reg_cost', 'orig_gko_cost', 'orig_gki_cost',
+    'compressed_model', 'compressed_map_reac', 'compressed_ko_cost', 'compressed_ki_cost',
+    'essential_kis', 'essential_reactions', 'compressed_essential_reactions', 'sd_modules', 'kwargs_milp',
+    'fva_lps_saved', 'gpr',
+]
+
+
+# seconds between checkpoints of a running MILP, besides the one after every solution
+checkpoint_interval = 60
+
 
 class StrainDesign(object):
     def __init__(self, model: Model, sd_modules: [SDModule], solver: str = None, M: int = None, compress: bool = True,
                  gene_kos: bool = False, ko_cost: dict = None, ki_cost: dict = None, gko_cost: dict = None, gki_cost: dict = None,
-                 reg_cost: dict = None, solution_approach: str = 'any', advanced: bool = False, use_scenario: bool = False, ) -> object:
+                 reg_cost: dict = None, solution_approach: str = 'any', advanced: bool = False, use_scenario: bool = False,
+                 cache_dir: str = None, processes: int = None, profile_dir: str = None, ) -> object:
         """
         Computes strain designs for a user-defined strain design problem
 
@@ -77,8 +109,9 @@ class StrainDesign(object):
                 the big-M method by default (with M=1000). M should be chosen 'sufficiently large' to avoid computational
                 artifacts and 'sufficiently small' to avoid numerical issues.
 
-            compress (optional (bool)): (Default: True)
-                If 'True', the iterative network compressor is used.
+            compress (optional (bool or str)): (Default: True)
+                If 'True', the iterative network compressor of straindesign is used. With 'sparse', the network is
+                compressed on a sparse matrix of fractions with syn_elong.sparse_compression instead.
 
             gene_kos (optional (bool)): (Default: False)
                 If 'True', strain designs are computed based on gene-knockouts instead of reaction knockouts. This
@@ -125,6 +158,25 @@ class StrainDesign(object):
                 the wildtype fulfills the criterion of maximal growth (inner objective) and maximality of the global objective is
                 omitted by using 'any', so that carrying no product synthesis is permitted. Additional constraints can be used
                 in the OptKnock problem to circumvent this. However, Optknock should generally be used with the 'best' option.
+
+            cache_dir (optional (str)): (Default: None)
+                Folder in which the preprocessed problem (compressed model, compression map, cost maps and essential
+                reactions) is stored. The entry is keyed by the model, the strain design modules, the costs and the
+                solver, so a later construction with the same inputs loads it instead of rerunning the FVAs and the
+                compression. syn_elong.cache.cache_dir('strain_design') is the shared cache folder. If None, nothing
+                is cached.
+
+            processes (optional (int)): (Default: None)
+                Number of worker processes for the essentiality FVAs. The FVAs of all non-SUPPRESS modules are split
+                into chunks of reactions and solved in one process pool, with a fresh solver instance per chunk, so the
+                result does not depend on the number of workers (1 solves the chunks in this process). If None, the
+                FVAs run one after the other with straindesign.fva.
+
+            profile_dir (optional (str)): (Default: None)
+                Wall time, CPU time, peak RSS and problem sizes of every phase (check_args, setup_gko, each FVA,
+                preprocess_model, modify_for_genes, compress_model, MILP build and solve, decompression) are
+                recorded in self.profile, a syn_elong.profiling.PhaseProfiler (self.profile.to_dict() / to_json()).
+                With a profile_dir, every phase is also dumped there as a cProfile file.
             """
 
         self.kwargs_milp = None
@@ -167,14 +219,83 @@ class StrainDesign(object):
         self.compressed_ko_cost = None
         self.essential_kis = set()
         self.essential_reactions = set()
+        self.compressed_essential_reactions = set()
+        # CompiledGPR of the model's rules with gene_kos, gpr.disabled_reactions(genes) maps gene knockouts to
+        # reactions
+        self.gpr = None
         self.orig_ko_cost = {}
         self.orig_ki_cost = {}
         self.orig_reg_cost = {}
 
         self.orig_gko_cost = {}
         self.orig_gki_cost = {}
-        self.steps()
- 
+        self.processes = processes
+        # sign of the essential flux per reaction and module from the uncompressed FVAs, see flux_sign
+        self.module_flux_signs = None
+        self.fva_lps_saved = 0
+        self.cache_dir = cache_dir
+        # key has to be computed before steps() touches the model, it also identifies the problem of checkpoints
+        self.cache_key = self.preprocessing_key()
+        self.profile = PhaseProfiler(profile_dir)
+        if self.cache_dir is None:
+            self.steps()
+        else:
+            with self.profile.phase('load_preprocessed') as record:
+                record['sizes']['cache_hit'] = self.load_preprocessed()
+            if not record['sizes']['cache_hit']:
+                self.steps()
+                self.save_preprocessed()
+
+    def preprocessing_key(self):
+        """ Hash of everything that determines the result of steps(). """
+        modules = [json.dumps(m, sort_keys=True, default=str) for m in self.orig_sd_modules]
+        costs = [
+            json.dumps(c, sort_keys=True, default=str)
+            for c in [self.ko_cost, self.ki_cost, self.gko_cost, self.gki_cost, self.reg_cost]
+        ]
+        settings = [self.solver, self.big_M, self.compress, self.gene_kos, version('straindesign')]
+        return cache.text_hash(
+            model_hash(self.model), *modules, *costs, *settings, cache.file_hash(__file__),
+            cache.file_hash(gpr.__file__), cache.file_hash(sparse_compression.__file__)
+        )
+
+    def _preprocessed_path(self):
+        return os.path.join(self.cache_dir, f'{self.cache_key}.pkl')
+
+    def load_preprocessed(self):
+        """ Restore the preprocessed problem from cache_dir, returns False if there is no entry. """
+        state = cache.load(self._preprocessed_path())
+        if state is None:
+            return False
+        logging.info(f'  Loaded preprocessed strain design problem {self.cache_key[:12]} from cache.')
+        # the model changes of check_args, the snapshot has to show the genes as steps() saw them
+        checks_genes = self.gene_kos or self.gko_cost is not None or self.gki_cost is not None
+        for k, v in state.items():
+            setattr(self, k, v)
+        if checks_genes:
+            self.prefix_gene_ids()
+        self.orig_model = ModelSnapshot(self.model)
+        # only used during preprocessing, which is skipped
+        self.uncompressed_model = self.orig_model
+        return True
+
+    def save_preprocessed(self):
+        cache.dump({k: getattr(self, k) for k in _preprocessed_attributes}, self._preprocessed_path())
+
+    def preprocessed_state(self):
+        """ Everything run() needs, to rebuild this problem in another process with from_state(). """
+        state = {k: getattr(self, k) for k in _preprocessed_attributes}
+        state.update({k: getattr(self, k) for k in ['orig_sd_modules', 'orig_model', 'solver', 'cache_key']})
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        """ StrainDesign ready to run() from a preprocessed_state(), without any preprocessing. """
+        sd_helper = cls.__new__(cls)
+        sd_helper.profile = PhaseProfiler()
+        sd_helper.__dict__.update(state)
+        return sd_helper
+
 
     def check_args(self):
         if self.big_M is None:
@@ -208,23 +329,34 @@ class StrainDesign(object):
         self.orig_reg_cost = deepcopy(self.reg_cost)
         if self.solution_approach not in [ANY, BEST, POPULATE]:
             raise Exception("Solution approach must be one of 'any', 'best' or 'populate'.")
-            # suppress standard output from copying model
+        # orig_model and uncompressed_model are only read, a snapshot is enough. Only the model that gets
+        # compressed needs a real copy.
+        self.orig_model = ModelSnapshot(self.model)
+        self.uncompressed_model = self.orig_model
+        # suppress standard output from copying model
         with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()), DisableLogger():
-            self.orig_model = self.model.copy()
-            self.uncompressed_model = self.model.copy()
             self.compressed_model = self.model.copy()
 
     def steps(self):
-        self.check_args()
+        with self.profile.phase('check_args', **model_sizes(self.model)):
+            self.check_args()
 
         if self.gene_kos:
-            self.setup_gko()
-        self.preprocess_model()
+            with self.profile.phase('setup_gko', genes=len(self.model.genes)):
+                self.setup_gko()
+        with self.profile.phase('preprocess_model') as record:
+            self.preprocess_model()
+            record['sizes']['essential_reactions'] = len(self.essential_reactions)
         if self.gene_kos:
-            self.modify_for_genes()
+            with self.profile.phase('modify_for_genes') as record:
+                self.modify_for_genes()
+                record['sizes'].update(model_sizes(self.compressed_model))
             # move gene ko costs to reaction ko costs
             self.uncompressed_ko_cost.update(self.uncompressed_gko_cost)
             self.uncompressed_ki_cost.update(self.uncompressed_gki_cost)
+        if self.uncompressed_reg_cost:
+            # regulatory constraints can change the flux ranges, the compressed FVAs have to start from scratch
+            self.module_flux_signs = None
         self.uncompressed_ko_cost.update(extend_model_regulatory(self.compressed_model, self.uncompressed_reg_cost))
 
         # make copy to modify for compressed
@@ -232,7 +364,13 @@ class StrainDesign(object):
         self.compressed_ki_cost = self.uncompressed_ki_cost
 
         if self.compress:
-            self.compress_model()
+            with self.profile.phase('compress_model') as record:
+                self.compress_model()
+                record['sizes'].update(model_sizes(self.compressed_model))
+                record['sizes']['essential_reactions'] = len(self.compressed_essential_reactions)
+                record['sizes']['fva_lps_saved'] = self.fva_lps_saved
+        else:
+            self.compressed_map_reac = []
 
         self.setup_milp_args()
 
@@ -241,10 +379,7 @@ class StrainDesign(object):
             self.gene_kos = False
             logging.warning("Gene knockouts were specified, but no genes are defined in the model. ")
             return
-        # genes must not begin with number, put a 'g' in front of genes that start with a number
-        if any([True for g in self.model.genes if g.id[0].isdigit()]):
-            logging.warning("Gene IDs must not start with a digit. Inserting prefix 'g' where necessary.")
-            rename_genes(self.model, {g.id: 'g' + g.id for g in self.model.genes if g.id[0].isdigit()})
+        self.prefix_gene_ids()
         used_gene_ids = set()
         if self.gko_cost is not None:
             used_gene_ids.update(self.gko_cost.keys())
@@ -258,6 +393,12 @@ class StrainDesign(object):
         if np.all([len(g.name) for g in self.model.genes]) and len(overlap):
             self.has_gene_names = True
 
+    def prefix_gene_ids(self):
+        # genes must not begin with number, put a 'g' in front of genes that start with a number
+        if any([True for g in self.model.genes if g.id[0].isdigit()]):
+            logging.warning("Gene IDs must not start with a digit. Inserting prefix 'g' where necessary.")
+            rename_genes(self.model, {g.id: 'g' + g.id for g in self.model.genes if g.id[0].isdigit()})
+
     def setup_gko(self):
         if self.gki_cost is None:
             self.gki_cost = {}
@@ -270,9 +411,10 @@ class StrainDesign(object):
         gene_interventions = set(self.uncompressed_gko_cost.keys()).union(self.uncompressed_gki_cost.keys())
         reactions_interventions = set(self.uncompressed_ko_cost.keys()).union(self.uncompressed_ki_cost.keys())
         overlap_1 = False
+        # gene interventions can be keyed by gene ids or names, as in remove_irrelevant_genes
         for r in reactions_interventions:
-            for g in self.uncompressed_model.reactions.get_by_id(r).genes:
-                if g in gene_interventions:
+            for g in self.uncompressed_model.reaction_genes(r):
+                if g in gene_interventions or self.uncompressed_model.gene_name(g) in gene_interventions:
                     overlap_1 = True
 
         overlap_2 = set(self.uncompressed_gko_cost.keys()).intersection(set(self.uncompressed_gki_cost.keys()))
@@ -283,6 +425,47 @@ class StrainDesign(object):
                             'Make sure that metabolic interventions are enabled either through reaction or '
                             'through gene interventions and are defined either as knock-ins or as knock-outs.')
 
+    def essentiality_constraints(self):
+        """ Constraints of each module that can define essential reactions. """
+        # Essential reactions can only be determined from desired or opt-/robustknock modules
+        return [m[CONSTRAINTS] for m in self.sd_modules if m[MODULE_TYPE] != SUPPRESS]
+
+    def module_fvas(self, constraint_sets=None, reaction_subsets=None):
+        """ FVA of the compressed model for each module that can define essential reactions. """
+        if constraint_sets is None:
+            constraint_sets = self.essentiality_constraints()
+        if reaction_subsets is None:
+            lps = 2 * len(self.compressed_model.reactions) * len(constraint_sets)
+        else:
+            lps = 2 * sum(len(subset) for subset in reaction_subsets)
+        with self.profile.phase('fva_essential', fvas=len(constraint_sets), lps=lps):
+            return fva_modules(self.compressed_model, constraint_sets, solver=self.solver, processes=self.processes,
+                               reaction_subsets=reaction_subsets)
+
+    def compressed_essentials(self, constraint_sets, module_flux_signs=None):
+        """
+        Essential reactions of the compressed model under any of the constraint sets.
+
+        module_flux_signs holds, per constraint set, the flux signs (see flux_sign) that are already known, these
+        reactions are not solved again. Returns the essential reactions and the number of LPs that were skipped.
+        """
+        if module_flux_signs is None:
+            module_flux_signs = [{} for _ in constraint_sets]
+        essential_reacs = set()
+        reaction_ids = self.compressed_model.reactions.list_attr('id')
+        for signs in module_flux_signs:
+            essential_reacs.update(reac_id for reac_id in reaction_ids if signs.get(reac_id))
+        reaction_subsets = [
+            [reac_id for reac_id in reaction_ids if reac_id not in essential_reacs and signs.get(reac_id) is None]
+            for signs in module_flux_signs
+        ]
+        lps_saved = 2 * sum(len(reaction_ids) - len(subset) for subset in reaction_subsets)
+        for flux_limits in self.module_fvas(constraint_sets, reaction_subsets):
+            for (reac_id, limits) in flux_limits.iterrows():
+                if flux_sign(limits):  # find essential
+                    essential_reacs.add(reac_id)
+        return essential_reacs, lps_saved
+
     def preprocess_model(self):
         # remove external metabolites
         remove_ext_mets(self.compressed_model)
@@ -290,16 +473,15 @@ class StrainDesign(object):
         remove_dummy_bounds(self.model)
         # FVAs to identify blocked, irreversible and essential reactions, as well as non-bounding bounds
         logging.info('  FVA to identify blocked reactions and irreversibility.')
-        bound_blocked_or_irrevers_fva(self.model, solver=self.solver)
+        with self.profile.phase('fva_blocked_irreversible', lps=2 * len(self.model.reactions)):
+            bound_blocked_or_irrevers_fva(self.model, solver=self.solver)
         logging.info('  FVA(s) to identify essential reactions.')
 
-        for m in self.sd_modules:
-            if m[MODULE_TYPE] != SUPPRESS:  # Essential reactions can only be determined from desired
-                # or opt-/robustknock modules
-                flux_limits = fva(self.compressed_model, solver=self.solver, constraints=m[CONSTRAINTS])
-                for (reac_id, limits) in flux_limits.iterrows():
-                    if np.min(abs(limits)) > 1e-10 and np.prod(np.sign(limits)) > 0:  # find essential
-                        self.essential_reactions.add(reac_id)
+        self.module_flux_signs = []
+        for flux_limits in self.module_fvas():
+            signs = {reac_id: flux_sign(limits) for (reac_id, limits) in flux_limits.iterrows()}
+            self.essential_reactions.update(reac_id for reac_id, sign in signs.items() if sign)
+            self.module_flux_signs.append(signs)
         logging.info(f'Essential reactions: {len(self.essential_reactions)}')
         # remove ko-costs (and thus knock ability) of essential reactions
         for er in self.essential_reactions:
@@ -309,13 +491,17 @@ class StrainDesign(object):
 
     def modify_for_genes(self):
         # If computation of gene-based intervention strategies
+        # the rules are parsed once, simplified and integrated from the compiled form
+        self.gpr = compile_gpr(self.compressed_model)
+        compiled = self.gpr
         if self.compress:
             num_genes = len(self.compressed_model.genes)
             num_gpr = len([True for r in self.model.reactions if r.gene_reaction_rule])
             logging.info(f'Preprocessing GPR rules {num_genes} genes, {num_gpr} gpr rules).')
             # removing irrelevant genes will also remove essential reactions from the list of knockable genes
-            self.uncompressed_gko_cost = remove_irrelevant_genes(
+            self.uncompressed_gko_cost, compiled = remove_irrelevant_genes(
                 self.compressed_model,
+                self.gpr,
                 list(self.essential_reactions),
                 self.uncompressed_gki_cost,
                 self.uncompressed_gko_cost
@@ -327,7 +513,12 @@ class StrainDesign(object):
                 num_gpr = len([True for r in self.compressed_model.reactions if r.gene_reaction_rule])
                 logging.info(f'  Simplified to {num_genes} genes and {num_gpr} gpr rules.')
         logging.info('  Extending metabolic network with gpr associations.')
-        reac_map = extend_model_gpr(self.compressed_model, self.has_gene_names)
+        reac_map = extend_model_gpr(self.compressed_model, compiled, self.has_gene_names)
+        # reversible reactions with genes are split in two, only reactions kept as they are keep their flux signs
+        self.module_flux_signs = [
+            {k: signs[k] for k, v in reac_map.items() if v == {k: 1.0} and k in signs}
+            for signs in self.module_flux_signs
+        ]
         for i, m in enumerate(self.sd_modules):
             for p in [CONSTRAINTS, INNER_OBJECTIVE, OUTER_OBJECTIVE, PROD_ID]:
                 if p in m and m[p] is not None:
@@ -346,7 +537,7 @@ class StrainDesign(object):
 
 
     def compress_model(self):
-        logging.info(f'Compressing Network ({len(self.uncompressed_model.reactions)} reactions).')
+        logging.info(f'Compressing Network ({len(self.uncompressed_model.reaction_ids)} reactions).')
         # compress network by lumping sequential and parallel reactions alternatively.
         # Exclude reactions named in strain design modules from parallel compression
         no_par_compress_reacs = set()
@@ -361,7 +552,10 @@ class StrainDesign(object):
                     if p in [INNER_OBJECTIVE, OUTER_OBJECTIVE, PROD_ID]:
                         for k in param.keys():
                             no_par_compress_reacs.add(k)
-        cmp_map_reac = compress_model(self.compressed_model, no_par_compress_reacs)
+        if self.compress == 'sparse':
+            cmp_map_reac = sparse_compression.compress_model_sparse(self.compressed_model, no_par_compress_reacs)
+        else:
+            cmp_map_reac = compress_model(self.compressed_model, no_par_compress_reacs)
         # compress information in strain design modules
         self.sd_modules = compress_modules(self.sd_modules, cmp_map_reac)
         # compress ko_cost and ki_cost
@@ -371,14 +565,15 @@ class StrainDesign(object):
 
         # An FVA to identify essentials before building and launching MILP (not sure if this has an effect)
         logging.info('  FVA(s) in compressed model to identify essential reactions.')
-        essential_reacs = set()
-        for m in self.sd_modules:
-            if m[MODULE_TYPE] != SUPPRESS:  # Essential reactions can only be determined from desired
-                # or opt-/robustknock modules
-                flux_limits = fva(self.compressed_model, solver=self.solver, constraints=m[CONSTRAINTS])
-                for (reac_id, limits) in flux_limits.iterrows():
-                    if np.min(abs(limits)) > 1e-10 and np.prod(np.sign(limits)) > 0:  # find essential
-                        essential_reacs.add(reac_id)
+        module_flux_signs = None
+        if self.module_flux_signs is not None:
+            # essentiality that carries over from the uncompressed FVAs does not have to be solved again
+            module_flux_signs = [compress_flux_signs(signs, cmp_map_reac) for signs in self.module_flux_signs]
+        essential_reacs, self.fva_lps_saved = self.compressed_essentials(
+            self.essentiality_constraints(), module_flux_signs
+        )
+        logging.info(f'  {self.fva_lps_saved} LPs saved with the essentiality of the uncompressed model.')
+        self.compressed_essential_reactions = essential_reacs
 
         # remove ko-costs (and thus knockability) of essential reactions
         for er in essential_reacs:
@@ -401,11 +596,217 @@ class StrainDesign(object):
         logging.info("Finished preprocessing:")
         logging.info(f"  Model size: {len(self.compressed_model.reactions)} rxns, "
                      f"{len(self.compressed_model.metabolites)} metabolites")
-        print(len(self.compressed_ko_cost), len(self.compressed_ki_cost), len(self.essential_kis))
         logging.info(f"  {len(self.compressed_ko_cost) + len(self.compressed_ki_cost) - len(self.essential_kis)} "
                      f"targetable reactions")
 
-    def run(self, max_solutions=5, time_limit=60, max_cost=np.inf, solution_approach=ANY):
+    def decompress(self, cmp_sd, max_cost):
+        """ Expand compressed strain designs to the original network and drop the ones above max_cost. """
+        with self.profile.phase('decompression', milp_solutions=len(cmp_sd)) as record:
+            designs = FactoredDesigns.from_compressed(cmp_sd, self.compressed_map_reac, self.uncompressed_ko_cost,
+                                                      self.uncompressed_ki_cost, self.uncompressed_reg_cost, max_cost)
+            record['sizes']['strain_designs'] = len(designs)
+        return designs
+
+    def build_milp(self, max_cost=np.inf, partition=None):
+        """
+        Strain design MILP of the compressed problem, reporting its solutions while it computes.
+
+        partition (optional (dict)): (Default: None)
+            {compressed reaction id: True to knock it out in every solution, False to never knock it out}, to solve
+            one part of the candidate space.
+        """
+        self.kwargs_milp['max_cost'] = max_cost
+        with self.profile.phase('milp_build', **model_sizes(self.compressed_model)) as record:
+            sd_milp = _StreamingSDMILP(self.compressed_model, self.sd_modules, **self.kwargs_milp)
+            record['sizes']['intervention_candidates'] = len(self.compressed_ko_cost) + len(self.compressed_ki_cost)
+        if partition:
+            sd_milp.fix_knockouts(partition)
+        return sd_milp
+
+    def compressed_reaction_id(self, reac_id):
+        """ Id of the compressed reaction a reaction of the uncompressed model was lumped into, None if removed. """
+        for step in self.compressed_map_reac:
+            reac_id = next((k for k, members in step['reac_map_exp'].items() if reac_id in members), None)
+            if reac_id is None:
+                return None
+        return reac_id
+
+    def iter_solutions(self, max_solutions=5, time_limit=60, max_cost=np.inf, solution_approach=ANY, sd_milp=None,
+                       checkpoint_dir=None, resume=False):
+        """
+        Yields the strain designs of every MILP solution as soon as the solver reports it.
+
+        Each item is a FactoredDesigns of the strain designs one MILP solution decompresses to, filtered by max_cost,
+        its designs are only combined when it is iterated or listed with to_list(). The MILP runs in a background
+        thread; closing the generator early stops it as soon as the solver returns from its current solve, and waits
+        for that. Once the generator is exhausted, self.milp_solution holds the SDSolutions of the compressed MILP
+        (status and setup). Arguments are the same as for run(). sd_milp can be a MILP from build_milp() that
+        earlier calls already solved, its max_cost is then set to the given one and its exclusion constraints are
+        kept; one that another iter_solutions is still solving is refused.
+
+        With a checkpoint_dir, the preprocessed problem is saved there at the start, and the solutions and exclusion
+        constraints found so far are saved after every solution and every checkpoint_interval seconds. With resume,
+        the solutions of the checkpoint are yielded first and the MILP continues with their exclusion constraints,
+        the remaining number of solutions and the remaining time.
+        """
+        if solution_approach not in [ANY, BEST, POPULATE]:
+            raise Exception("Solution approach must be one of 'any', 'best' or 'populate'.")
+        self.milp_solution = None
+        progress = {
+            'run': {'max_solutions': max_solutions, 'time_limit': time_limit, 'max_cost': max_cost,
+                    'solution_approach': solution_approach},
+            'problem': self.cache_key, 'cmp_sd': [], 'cuts': [], 'elapsed': 0.0, 'milp_solution': None,
+        }
+        if checkpoint_dir is not None:
+            saved = cache.load(os.path.join(checkpoint_dir, 'progress.pkl')) if resume else None
+            if saved is None:
+                cache.dump(self.preprocessed_state(), os.path.join(checkpoint_dir, 'state.pkl'))
+            else:
+                if saved.get('problem') != self.cache_key:
+                    raise Exception(f'The checkpoint in {checkpoint_dir} belongs to another strain design problem.')
+                if saved['run'] != progress['run']:
+                    raise Exception(f"The checkpoint in {checkpoint_dir} is of a run with {saved['run']}, not "
+                                    f"{progress['run']}.")
+                progress = saved
+                logging.info(f"  Resuming from {len(progress['cmp_sd'])} MILP solutions after "
+                             f"{progress['elapsed']:.0f} s.")
+        for cmp_sd in progress['cmp_sd']:
+            yield self.decompress([cmp_sd], max_cost)
+        if progress['milp_solution'] is not None:
+            # the checkpointed run had finished
+            self.milp_solution = progress['milp_solution']
+            return
+
+        if sd_milp is None:
+            sd_milp = self.build_milp(max_cost)
+        elif sd_milp.thread is not None and sd_milp.thread.is_alive():
+            raise Exception('The MILP is still being solved by an earlier iter_solutions.')
+        else:
+            sd_milp.set_max_cost(max_cost)
+        sd_milp.restore_cuts(progress['cuts'])
+        found = queue.Queue()
+        sd_milp.on_solution = found.put
+        sd_milp.stopped = False
+
+        kwargs_computation = {
+            'show_no_ki': True,
+            'max_solutions': max_solutions - len(progress['cmp_sd']),
+            'time_limit': max(time_limit - progress['elapsed'], 0),
+        }
+        compute = {ANY: sd_milp.compute, BEST: sd_milp.compute_optimal, POPULATE: sd_milp.enumerate}[solution_approach]
+
+        def solve():
+            try:
+                with self.profile.phase('milp_solve', solution_approach=solution_approach):
+                    result = compute(**kwargs_computation)
+                found.put(_MILPFinished(result))
+            except _StopMILP:
+                pass
+            except Exception as e:
+                found.put(_MILPFinished(e))
+
+        start, elapsed_before = time.perf_counter(), progress['elapsed']
+
+        def save_progress():
+            if checkpoint_dir is not None:
+                progress['cuts'] = list(sd_milp.cuts)
+                progress['elapsed'] = elapsed_before + time.perf_counter() - start
+                cache.dump(progress, os.path.join(checkpoint_dir, 'progress.pkl'))
+
+        if kwargs_computation['time_limit'] <= 0:
+            # the checkpointed run used up the time limit, the MILP would not run and report OPTIMAL
+            sd_milp.max_solutions, sd_milp.time_limit = kwargs_computation['max_solutions'], time_limit
+            status = TIME_LIMIT_W_SOL if progress['cmp_sd'] else TIME_LIMIT
+            self.milp_solution = sd_milp.build_sd_solution([], status, solution_approach)
+            progress['milp_solution'] = self.milp_solution
+            save_progress()
+            return
+
+        sd_milp.thread = threading.Thread(target=solve, daemon=True)
+        sd_milp.thread.start()
+        num_streamed = 0
+        try:
+            while True:
+                try:
+                    item = found.get(timeout=checkpoint_interval)
+                except queue.Empty:
+                    save_progress()
+                    continue
+                if isinstance(item, _MILPFinished):
+                    break
+                num_streamed += 1
+                progress['cmp_sd'].append(item)
+                save_progress()
+                yield self.decompress([item], max_cost)
+        finally:
+            sd_milp.stopped = True
+            sd_milp.thread.join()
+        if isinstance(item.result, Exception):
+            raise item.result
+        self.milp_solution = item.result
+        # solutions the MILP returns without finding them, e.g. no intervention needed at all
+        extra_cmp_sd = []
+        if self.milp_solution.status in [OPTIMAL, TIME_LIMIT_W_SOL]:
+            extra_cmp_sd = self.milp_solution.get_reaction_sd_mark_no_ki()[num_streamed:]
+        progress['cmp_sd'].extend(extra_cmp_sd)
+        progress['milp_solution'] = self.milp_solution
+        save_progress()
+        for cmp_sd in extra_cmp_sd:
+            yield self.decompress([cmp_sd], max_cost)
+
+    def sweep_max_cost(self, max_costs, max_solutions=5, time_limit=60, solution_approach=ANY):
+        """
+        Strain designs for a series of max_cost values, solved on one MILP.
+
+        The MILP is built once. Between steps only its cost constraint is changed, so the solver keeps its state and
+        the exclusion constraints of the solutions already found: every step only returns designs that are new at
+        its max_cost. With increasing max_costs (e.g. 1, 2, 3, ...) this lists the cheapest designs first.
+        max_solutions and time_limit apply to each step.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per max_cost with the MILP status, the number of new MILP solutions, their decompressed
+            strain designs and the time the step took.
+        """
+        sd_milp = None
+        rows = []
+        for max_cost in max_costs:
+            start = time.perf_counter()
+            if sd_milp is None:
+                sd_milp = self.build_milp(max_cost)
+            designs = list(self.iter_solutions(max_solutions, time_limit, max_cost, solution_approach, sd_milp))
+            rows.append({
+                'max_cost': max_cost,
+                'status': self.milp_solution.status,
+                'milp_solutions': len(designs),
+                'strain_designs': [s for d in designs for s in d.to_list()],
+                'time': time.perf_counter() - start,
+            })
+            logging.info(f"  max_cost {max_cost}: {len(designs)} new MILP solutions in {rows[-1]['time']:.1f} s.")
+        return pd.DataFrame(rows).set_index('max_cost')
+
+    def run_factored(self, max_solutions=5, time_limit=60, max_cost=np.inf, solution_approach=ANY,
+                     checkpoint_dir=None, resume=False):
+        """
+        Same as run(), but returns the strain designs as one FactoredDesigns instead of an SDSolutions.
+
+        The decompressed designs are not listed one by one, so counting them, their reaction frequencies or a
+        tighter cost filter stay cheap when a MILP solution stands for very many designs. The MILP status is in
+        self.milp_solution.
+        """
+        logging.info('  Decompressing solutions as they are found.')
+        designs = FactoredDesigns(ko_cost=self.uncompressed_ko_cost, ki_cost=self.uncompressed_ki_cost,
+                                  reg_cost=self.uncompressed_reg_cost, max_cost=max_cost if max_cost else None)
+        for solution_designs in self.iter_solutions(max_solutions, time_limit, max_cost, solution_approach,
+                                                    checkpoint_dir=checkpoint_dir, resume=resume):
+            designs.extend(solution_designs)
+        if self.milp_solution.status not in [OPTIMAL, TIME_LIMIT_W_SOL]:
+            designs.designs = []
+        return designs
+
+    def run(self, max_solutions=5, time_limit=60, max_cost=np.inf, solution_approach=ANY, checkpoint_dir=None,
+            resume=False):
         """
         max_cost (optional (int)): (Default: inf):
             The maximum cost threshold for interventions. Every possible intervention is associated with a
@@ -421,47 +822,298 @@ class StrainDesign(object):
         time_limit (optional (int)): (Default: inf)
             The time limit in seconds for the MILP-solver.
 
+        checkpoint_dir (optional (str)): (Default: None)
+            Folder to save the preprocessed problem and the progress of the MILP in, see iter_solutions. A run that
+            was killed can be continued with StrainDesign.resume(checkpoint_dir).
 
+        resume (optional (bool)): (Default: False)
+            Continue from the progress saved in checkpoint_dir instead of starting over.
         """
-        self.kwargs_milp['max_cost'] = max_cost
-        sd_milp = SDMILP(self.compressed_model, self.sd_modules, **self.kwargs_milp)
+        sd = self.run_factored(max_solutions, time_limit, max_cost, solution_approach, checkpoint_dir,
+                               resume).to_list()
+        return self.to_sd_solutions(sd, self.milp_solution.status, self.milp_solution.sd_setup)
 
-        kwargs_computation = {
-            'show_no_ki': True,
-            'max_solutions': max_solutions,
-            'time_limit': time_limit,
-        }
-
-        # solve MILP
-        if solution_approach == ANY:
-            cmp_sd_solution = sd_milp.compute(**kwargs_computation)
-        elif solution_approach == BEST:
-            cmp_sd_solution = sd_milp.compute_optimal(**kwargs_computation)
-        elif solution_approach == POPULATE:
-            cmp_sd_solution = sd_milp.enumerate(**kwargs_computation)
-        else:
-            raise ERROR
-
-        logging.info('  Decompressing.')
-        if cmp_sd_solution.status in [OPTIMAL, TIME_LIMIT_W_SOL]:
-            sd = expand_sd(cmp_sd_solution.get_reaction_sd_mark_no_ki(), self.compressed_map_reac)
-            sd = filter_sd_maxcost(sd, max_cost, self.uncompressed_ko_cost, self.uncompressed_ki_cost)
-            sd = postprocess_reg_sd(self.uncompressed_reg_cost, sd)
-        else:
-            sd = []
-
-        setup = deepcopy(cmp_sd_solution.sd_setup)
+    def to_sd_solutions(self, sd, status, sd_setup):
+        """ SDSolutions of decompressed strain designs on the original model, with the setup of the MILP. """
+        setup = deepcopy(sd_setup)
         setup.update({MODULES: self.orig_sd_modules, KOCOST: self.orig_ko_cost,
                       KICOST: self.orig_ki_cost, REGCOST: self.orig_reg_cost})
         if self.gene_kos:
             setup.update({GKOCOST: self.orig_gko_cost, GKICOST: self.orig_gki_cost})
-        sd_solutions = SDSolutions(self.orig_model, sd, cmp_sd_solution.status, setup)
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()), DisableLogger():
+            orig_model = self.orig_model.model
+        sd_solutions = SDSolutions(orig_model, sd, status, setup)
         logging.info(str(len(sd)) + ' solutions found.')
 
         return sd_solutions
 
+    @classmethod
+    def resume(cls, checkpoint_dir):
+        """ Continue a run() with a checkpoint_dir, without preprocessing again. Returns the SDSolutions. """
+        state = cache.load(os.path.join(checkpoint_dir, 'state.pkl'))
+        progress = cache.load(os.path.join(checkpoint_dir, 'progress.pkl'))
+        if state is None or progress is None:
+            raise Exception(f'No strain design checkpoint in {checkpoint_dir}.')
+        return cls.from_state(state).run(**progress['run'], checkpoint_dir=checkpoint_dir, resume=True)
 
+    def problem_class(self):
+        """ Label of the kind of strain design problem, used to group portfolio wins. """
+        module_types = '+'.join(sorted(m[MODULE_TYPE] for m in self.orig_sd_modules))
+        return f"{module_types}{'/genes' if self.gene_kos else ''}"
 
+    def default_portfolio(self):
+        """ ANY vs BEST on the own solver, indicator constraints where supported and the other open solvers. """
+        portfolio = [
+            {SOLVER: self.solver, SOLUTION_APPROACH: ANY, 'M': self.big_M},
+            {SOLVER: self.solver, SOLUTION_APPROACH: BEST, 'M': self.big_M},
+        ]
+        if self.solver in [CPLEX, GUROBI]:
+            portfolio.append({SOLVER: self.solver, SOLUTION_APPROACH: ANY, 'M': None})
+        for solver in [GLPK, SCIP]:
+            if solver in avail_solvers and solver != self.solver:
+                portfolio.append({SOLVER: solver, SOLUTION_APPROACH: ANY, 'M': None})
+        return portfolio
+
+    def run_portfolio(self, portfolio=None, max_solutions=5, time_limit=60, max_cost=np.inf, wins_file=None):
+        """
+        Races several solver configurations on the preprocessed problem and returns the first result.
+
+        Every configuration of the portfolio runs run() in its own process. All processes load the same pickled
+        preprocessed_state(), nothing is preprocessed again. The first configuration to return solutions
+        (OPTIMAL or TIME_LIMIT_W_SOL) or to prove that there are none (INFEASIBLE) wins and the other processes are
+        terminated; results without either, e.g. TIME_LIMIT, and failures keep the race going. Every finished
+        configuration is appended to wins_file (a json line each, with 'won', default portfolio_wins.jsonl in the
+        strain_design cache folder), see portfolio_wins().
+
+        portfolio (optional (list of dict)): (Default: default_portfolio())
+            Configurations with the keys 'solver', 'solution_approach' and 'M' (None for indicator constraints).
+            Missing keys keep the value of this StrainDesign.
+
+        Other arguments are the same as for run().
+        """
+        if portfolio is None:
+            portfolio = self.default_portfolio()
+        if wins_file is None:
+            wins_file = cache.cache_dir('strain_design').joinpath('portfolio_wins.jsonl')
+        run_kwargs = {'max_solutions': max_solutions, 'time_limit': time_limit, 'max_cost': max_cost}
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        with tempfile.TemporaryDirectory() as tmp:
+            state_path = os.path.join(tmp, 'preprocessed.pkl')
+            cache.dump(self.preprocessed_state(), state_path)
+            start = time.perf_counter()
+            workers = [
+                context.Process(target=_portfolio_worker, args=(i, state_path, config, run_kwargs, results),
+                                daemon=True)
+                for i, config in enumerate(portfolio)
+            ]
+            for w in workers:
+                w.start()
+            winner = None
+            # results that are no answer (e.g. TIME_LIMIT without solutions), returned if nothing better comes
+            fallback = None
+            finishes = []
+            pending = len(workers)
+            try:
+                while pending and winner is None:
+                    try:
+                        i, sd_solutions = results.get(timeout=1)
+                    except queue.Empty:
+                        # a worker that died without reporting (e.g. a solver crash) never answers
+                        if not any(w.is_alive() for w in workers) and results.empty():
+                            break
+                        continue
+                    pending -= 1
+                    finish = {'index': i, 'time': time.perf_counter() - start}
+                    if isinstance(sd_solutions, Exception):
+                        logging.warning(f'Portfolio configuration {portfolio[i]} failed: {sd_solutions}')
+                        finish['error'] = repr(sd_solutions)
+                    else:
+                        finish['status'] = sd_solutions.status
+                        if sd_solutions.status in [OPTIMAL, TIME_LIMIT_W_SOL, INFEASIBLE]:
+                            winner = i
+                        else:
+                            logging.info(f'Portfolio configuration {portfolio[i]} finished with '
+                                         f'{sd_solutions.status}, waiting for the others.')
+                            fallback = sd_solutions
+                    finishes.append(finish)
+            finally:
+                for w in workers:
+                    if w.is_alive():
+                        w.terminate()
+                    w.join()
+        elapsed = time.perf_counter() - start
+        with open(wins_file, 'a') as f:
+            for finish in finishes:
+                i = finish.pop('index')
+                f.write(json.dumps({
+                    'problem_class': self.problem_class(),
+                    'config': portfolio[i],
+                    'won': i == winner,
+                    **finish,
+                    'portfolio': portfolio,
+                }, default=str) + '\n')
+        if winner is None:
+            if fallback is None:
+                raise Exception('All portfolio configurations failed.')
+            logging.warning(f'No portfolio configuration found solutions or proved that there are none within '
+                            f'{elapsed:.1f} s.')
+            return fallback
+        logging.info(f'Portfolio won by {portfolio[winner]} after {elapsed:.1f} s.')
+        return sd_solutions
+
+
+def portfolio_wins(wins_file=None):
+    """ Wins of the logged portfolio races, counted per problem class and configuration. """
+    if wins_file is None:
+        wins_file = cache.cache_dir('strain_design').joinpath('portfolio_wins.jsonl')
+    with open(wins_file) as f:
+        races = [json.loads(line) for line in f if line.strip()]
+    races = [r for r in races if r.get('won', True)]
+    wins = pd.DataFrame({
+        'problem_class': [r['problem_class'] for r in races],
+        'config': [json.dumps(r['config'], sort_keys=True) for r in races],
+        'time': [r['time'] for r in races],
+    })
+    return wins.groupby(['problem_class', 'config'])['time'].agg(['count', 'median'])
+
+
+def _portfolio_worker(index, state_path, config, run_kwargs, results):
+    try:
+        sd_helper = StrainDesign.from_state(cache.load(state_path))
+        solution_approach = config.get(SOLUTION_APPROACH, ANY)
+        sd_helper.kwargs_milp = dict(sd_helper.kwargs_milp)
+        sd_helper.kwargs_milp[SOLVER] = config.get(SOLVER, sd_helper.solver)
+        if 'M' in config:
+            sd_helper.kwargs_milp['M'] = config['M']
+        results.put((index, sd_helper.run(solution_approach=solution_approach, **run_kwargs)))
+    except Exception as e:
+        results.put((index, e))
+
+
+class _StopMILP(Exception):
+    pass
+
+
+class _MILPFinished(object):
+    def __init__(self, result):
+        self.result = result
+
+
+class _StreamingSDMILP(SDMILP):
+    """SDMILP that reports every accepted solution while it is still computing
+
+    SDMILP.compute, compute_optimal and enumerate all add an exclusion constraint for a solution right after they
+    verified and accepted it, so the solution that is excluded right after it was verified is handed to on_solution.
+    Rows verified earlier, e.g. the unminimized solution of compute, are excluded without being accepted. Once
+    stopped, the next exclusion constraint or time limit ends the computation with _StopMILP."""
+
+    def __init__(self, model, sd_modules, on_solution=None, **kwargs):
+        self.on_solution = on_solution
+        self.stopped = False
+        # background thread of iter_solutions solving this MILP
+        self.thread = None
+        self._just_verified = None
+        # exclusion constraints added so far, as (SDMILP method, z), to restore them in a new MILP
+        self.cuts = []
+        super().__init__(model, sd_modules, **kwargs)
+
+    def restore_cuts(self, cuts):
+        for method, z in cuts:
+            getattr(SDMILP, method)(self, z)
+            self.cuts.append((method, z))
+
+    def fix_knockouts(self, fixed):
+        """ Force ({reaction id: True}) or forbid ({reaction id: False}) the knockout of reactions. """
+        reac_ids = self.model.reactions.list_attr('id')
+        for reac_id, knocked_out in fixed.items():
+            i = reac_ids.index(reac_id)
+            if self.z_non_targetable[i] or self.z_inverted[i]:
+                raise Exception(f'{reac_id} is no knockout candidate of the strain design MILP.')
+            if knocked_out:
+                a_ineq = sparse.csr_matrix(([-1.0], ([0], [i])), shape=(1, self.A_ineq.shape[1]))
+                self.add_ineq_constraints(a_ineq, [-1.0])
+            else:
+                # as add_exclusion_constraints does for a single intervention, kept by resetTargetableZ
+                self.z_non_targetable[i] = True
+                self.set_ub([[i, 0.0]])
+
+    def set_max_cost(self, max_cost):
+        """ Replace the upper bound of the intervention cost, keeping everything else of the MILP. """
+        self.max_cost = max_cost
+        if max_cost is None or np.isinf(max_cost):
+            max_cost = float(np.sum(np.abs(self.cost)))
+        a_ineq = [0.0] * len(self.c_bu)
+        for i in self.idx_z:
+            a_ineq[i] = self.cost[i]
+        self.set_ineq_constraint(self.idx_row_mincost, a_ineq, float(max_cost))
+
+    @staticmethod
+    def _key(z):
+        return tuple(z.indices), tuple(z.data)
+
+    def verify_sd(self, sols):
+        valid = super().verify_sd(sols)
+        self._just_verified = self._key(sols.getrow(0)) if sols.shape[0] == 1 and all(valid) else None
+        return valid
+
+    def set_time_limit(self, t):
+        if self.stopped:
+            raise _StopMILP()
+        super().set_time_limit(t)
+
+    def add_exclusion_constraints_ineq(self, z):
+        super().add_exclusion_constraints_ineq(z)
+        self.cuts.append(('add_exclusion_constraints_ineq', z))
+
+    def add_exclusion_constraints(self, z):
+        super().add_exclusion_constraints(z)
+        self.cuts.append(('add_exclusion_constraints', z))
+        if self.stopped:
+            raise _StopMILP()
+        accepted = z.shape[0] == 1 and self._key(z) == self._just_verified
+        self._just_verified = None
+        if accepted:
+            self.on_solution(self.sd2dict(z, self.show_no_ki))
+
+
+def model_sizes(model):
+    """ Problem size of a model for the phase records. """
+    return {'reactions': len(model.reactions), 'metabolites': len(model.metabolites), 'genes': len(model.genes)}
+
+
+def flux_sign(limits):
+    """Direction of an essential flux from its FVA limits
+
+    1 or -1 if the flux is bounded away from zero, 0 if it is not and None if the FVA was infeasible"""
+    if np.isnan(limits).any():
+        return None
+    if np.min(abs(limits)) > 1e-10 and np.prod(np.sign(limits)) > 0:
+        return int(np.sign(limits.iloc[0]))
+    return 0
+
+
+def compress_flux_signs(signs, cmp_map_reac):
+    """Map flux signs of uncompressed reactions onto compressed reactions
+
+    Reactions lumped in sequence carry a fixed multiple of the lumped flux, so any member with a known sign
+    determines it. A parallel lump is only known to be essential if all members are essential in the same direction.
+    Reactions without a known sign are left out."""
+    for cmp in cmp_map_reac:
+        compressed_signs = {}
+        for new_reac, old_reacs in cmp['reac_map_exp'].items():
+            member_signs = [
+                None if signs.get(k) is None else signs[k] * int(np.sign(float(v))) for k, v in old_reacs.items()
+            ]
+            if cmp['parallel'] and len(member_signs) > 1:
+                if member_signs[0] and all(m == member_signs[0] for m in member_signs):
+                    compressed_signs[new_reac] = member_signs[0]
+            else:
+                known = [m for m in member_signs if m is not None]
+                if known:
+                    compressed_signs[new_reac] = known[0]
+        signs = compressed_signs
+    return signs
 
 
 def postprocess_reg_sd(reg_cost, sd):
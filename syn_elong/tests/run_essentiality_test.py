@@ -1,23 +1,20 @@
-from memote.suite.cli.reports import snapshot
+import logging
+
+from syn_elong.checks import main
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
 
     args = [
         '../syn_elong.xml',
-        '--filename', 'essential_only_report.html',
+        '--output', 'essential_only_results.json',
 
         # '../new_syn.xml',
-        # '--filename', 'essential_only_report2.html',
-
-
-        '--experimental', '../data/experiments.yml',
-        # '--exclusive', 'test_essentiality',
-        '--pytest-args', '--tb=long'
-
+        # '--output', 'essential_only_results2.json',
+        # '--baseline', 'essential_only_results.json',
 
+        '--checks', 'essentiality',
     ]
 
-    snapshot(
-       args
-    )
+    raise SystemExit(main(args))
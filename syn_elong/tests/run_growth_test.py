@@ -1,19 +1,16 @@
-from memote.suite.cli.reports import snapshot
+import logging
+
+from syn_elong.checks import main
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
 
     args = [
         '../new_syn.xml',
-        '--filename', 'growth_report_new.html',
-
-        '--experimental', '../data/experiments.yml',
-        '--exclusive', 'test_growth',
-        '--pytest-args', '--tb=long'
-
+        '--output', 'growth_results_new.json',
 
+        '--checks', 'growth',
     ]
 
-    snapshot(
-       args
-    )
+    raise SystemExit(main(args))
@@ -0,0 +1,202 @@
+"""
+Indexed on-disk store of the BiGG universal model.
+
+The update functions only ever copy a few dozen reactions out of the
+universal model, but loading it means parsing every reaction. The store keeps
+one JSON record per reaction and per metabolite in two flat data files plus an
+index of byte offsets. Lookups memory-map the data files and only decode the
+requested records, so fetching N reactions costs O(N) regardless of the size
+of the universal model.
+
+The store is built from ``concerto``'s universal model and lives in the
+``universal_store`` cache folder (see ``syn_elong.cache``). Its index records a
+hash of the source (concerto's loader and the model files shipped with it), and
+the store is rebuilt when the installed source no longer matches.
+"""
+import json
+import logging
+import mmap
+import pathlib
+
+from cobra import Metabolite, Reaction
+
+from syn_elong import cache
+
+log = logging.getLogger(__name__)
+
+_index_name = 'index.json'
+_data_names = {'reactions': 'reactions.jsonl', 'metabolites': 'metabolites.jsonl'}
+
+# files concerto's universal model can be loaded from
+_model_suffixes = {'.json', '.xml', '.sbml', '.gz', '.pkl', '.pickle', '.mat'}
+
+_source_hash = None
+
+_metabolite_attributes = ['id', 'name', 'formula', 'compartment', 'charge']
+_reaction_attributes = ['id', 'name', 'subsystem', 'lower_bound', 'upper_bound', 'gene_reaction_rule']
+
+
+def _metabolite_record(metabolite):
+    record = {k: getattr(metabolite, k) for k in _metabolite_attributes}
+    record['annotation'] = metabolite.annotation
+    record['notes'] = metabolite.notes
+    return record
+
+
+def _reaction_record(reaction):
+    record = {k: getattr(reaction, k) for k in _reaction_attributes}
+    record['metabolites'] = {m.id: c for m, c in reaction.metabolites.items()}
+    record['annotation'] = reaction.annotation
+    record['notes'] = reaction.notes
+    return record
+
+
+def source_hash():
+    """ Hash of concerto's universal model source: the module that loads it and the model files in the package. """
+    global _source_hash
+    if _source_hash is None:
+        import concerto
+        from concerto.utils import biolog_help
+        root = pathlib.Path(concerto.__file__).parent
+        files = sorted(p for p in root.rglob('*') if p.is_file() and p.suffix in _model_suffixes)
+        _source_hash = cache.text_hash(
+            cache.file_hash(biolog_help.__file__), *(f'{p.relative_to(root)}:{cache.file_hash(p)}' for p in files)
+        )
+    return _source_hash
+
+
+def build_universal_store(universal_model, store_dir=None, source=None):
+    """
+    Write the reaction/metabolite records and offset index of a model.
+
+    Parameters
+    ----------
+    universal_model : cobra.Model
+    store_dir : str, optional
+        Defaults to the ``universal_store`` cache folder.
+    source : str, optional
+        Hash of the source of the universal model, stored in the index.
+
+    Returns
+    -------
+    UniversalStore
+    """
+    store_dir = pathlib.Path(store_dir or cache.cache_dir('universal_store'))
+    store_dir.mkdir(parents=True, exist_ok=True)
+    sections = {
+        'reactions': (_reaction_record(r) for r in universal_model.reactions),
+        'metabolites': (_metabolite_record(m) for m in universal_model.metabolites),
+    }
+    index = {'source': source}
+    for section, records in sections.items():
+        offsets = {}
+        with open(store_dir.joinpath(_data_names[section]), 'wb') as f:
+            for record in records:
+                line = json.dumps(record).encode('utf-8')
+                offsets[record['id']] = (f.tell(), len(line))
+                f.write(line + b'\n')
+        index[section] = offsets
+    # index is written last, so an interrupted build is never picked up as complete
+    with open(store_dir.joinpath(_index_name), 'w') as f:
+        json.dump(index, f)
+    log.info(f"Indexed {len(index['reactions'])} reactions and "
+             f"{len(index['metabolites'])} metabolites in {store_dir}")
+    return UniversalStore(store_dir)
+
+
+class UniversalStore(object):
+    """ Read-only, memory-mapped lookup of universal model reactions by id. """
+
+    def __init__(self, store_dir):
+        self.store_dir = pathlib.Path(store_dir)
+        with open(self.store_dir.joinpath(_index_name)) as f:
+            self._index = json.load(f)
+        self.source = self._index.get('source')
+        self._files = {}
+        self._maps = {}
+        for section, name in _data_names.items():
+            self._files[section] = open(self.store_dir.joinpath(name), 'rb')
+            self._maps[section] = mmap.mmap(self._files[section].fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __contains__(self, reaction_id):
+        return reaction_id in self._index['reactions']
+
+    def __len__(self):
+        return len(self._index['reactions'])
+
+    def _record(self, section, item_id):
+        try:
+            offset, length = self._index[section][item_id]
+        except KeyError:
+            raise KeyError(f"{item_id} not in universal model {section}")
+        return json.loads(self._maps[section][offset:offset + length])
+
+    def get_metabolite(self, metabolite_id):
+        """ Fresh cobra.Metabolite for a universal model metabolite id. """
+        record = self._record('metabolites', metabolite_id)
+        metabolite = Metabolite(
+            record['id'],
+            formula=record['formula'],
+            name=record['name'],
+            compartment=record['compartment'],
+            charge=record['charge'],
+        )
+        metabolite.annotation = record['annotation']
+        metabolite.notes = record['notes']
+        return metabolite
+
+    def get_reaction(self, reaction_id):
+        """ Fresh cobra.Reaction (with its metabolites) for a universal model reaction id. """
+        record = self._record('reactions', reaction_id)
+        reaction = Reaction(
+            record['id'],
+            name=record['name'],
+            subsystem=record['subsystem'],
+            lower_bound=record['lower_bound'],
+            upper_bound=record['upper_bound'],
+        )
+        reaction.add_metabolites(
+            {self.get_metabolite(m): c for m, c in record['metabolites'].items()}
+        )
+        if record['gene_reaction_rule']:
+            reaction.gene_reaction_rule = record['gene_reaction_rule']
+        reaction.annotation = record['annotation']
+        reaction.notes = record['notes']
+        return reaction
+
+    def get_reactions(self, reaction_ids):
+        """ Fresh copies of several reactions, in the given order. """
+        return [self.get_reaction(r) for r in reaction_ids]
+
+    def close(self):
+        for section in _data_names:
+            self._maps[section].close()
+            self._files[section].close()
+
+
+_store = None
+
+
+def universal_store(store_dir=None):
+    """
+    Shared store instance, (re)built from concerto's universal model when missing or built from another source.
+    """
+    global _store
+    if _store is not None and store_dir is None:
+        return _store
+    path = pathlib.Path(store_dir or cache.cache_dir('universal_store'))
+    source = source_hash()
+    store = None
+    if path.joinpath(_index_name).exists():
+        store = UniversalStore(path)
+        if store.source != source:
+            log.info("Universal model source changed, rebuilding the store")
+            store.close()
+            store = None
+    if store is None:
+        from concerto.utils.biolog_help import load_universal_model
+        log.info("Building universal model store")
+        store = build_universal_store(load_universal_model(), path, source)
+    if store_dir is None:
+        _store = store
+    return store
@@ -0,0 +1,177 @@
+"""
+In-silico validation and ranking of strain designs.
+
+Every design is applied to the model in a model context (knockouts and knock-ins
+that were not made get zero bounds) and checked with three LPs: maximal growth,
+then minimal and maximal product flux at that growth. Designs are sorted so that
+similar knockout sets are next to each other and evaluated in contiguous chunks
+on one model per worker process, so each LP starts from the basis of the last,
+similar, design. Gene knockouts are turned into the reactions they disable with
+the compiled GPR rules of the model.
+
+    python -m syn_elong.validate_designs
+"""
+import logging
+import math
+
+import pandas as pd
+from straindesign import SDPool
+
+from syn_elong.gpr import compile_gpr
+
+log = logging.getLogger(__name__)
+
+default_chunk_size = 16
+
+_worker = {}
+
+
+def _worker_init(model, biomass, product, growth_tolerance, gpr):
+    _worker['model'] = model
+    _worker['settings'] = (biomass, product, growth_tolerance, gpr)
+
+
+def evaluate_design(model, design, biomass, product, growth_tolerance=1e-6, gpr=None):
+    """
+    Growth and production of the model with a strain design applied.
+
+    Parameters
+    ----------
+    model : cobra.Model
+    design : dict
+        {reaction or gene id: value} as in SDSolutions.reaction_sd, -1 for a knockout, 1 for a knock-in that is made
+        and 0 for a knock-in that is not made. Other keys (e.g. regulatory interventions) are ignored.
+    biomass, product : str
+        Reaction ids.
+    growth_tolerance : float
+        Relative slack on the maximal growth when the product flux at maximal growth is computed.
+    gpr : syn_elong.gpr.CompiledGPR, optional
+        Compiled rules of the model, needed for gene interventions.
+
+    Returns
+    -------
+    dict
+    """
+    knockouts = {k for k, v in design.items() if model.reactions.has_id(k) and not v > 0}
+    if gpr is not None:
+        knockouts.update(gpr.disabled_reactions([k for k, v in design.items() if k in gpr.gene_index and not v > 0]))
+    with model:
+        for reac_id in knockouts:
+            model.reactions.get_by_id(reac_id).bounds = (0, 0)
+        model.objective = biomass
+        max_growth = model.slim_optimize(error_value=math.nan)
+        min_product = max_product = math.nan
+        if not math.isnan(max_growth):
+            growth = model.reactions.get_by_id(biomass)
+            growth.lower_bound = max_growth * (1 - growth_tolerance)
+            model.objective = product
+            model.objective_direction = 'max'
+            max_product = model.slim_optimize(error_value=math.nan)
+            model.objective_direction = 'min'
+            min_product = model.slim_optimize(error_value=math.nan)
+    # 1 when every flux distribution with maximal growth makes the maximal product flux, 0 when one makes none
+    coupling = min_product / max_product if max_product and max_product > 0 else 0.0
+    return {
+        'interventions': sum(1 for v in design.values() if v != 0),
+        'max_growth': max_growth,
+        'min_product': min_product,
+        'max_product': max_product,
+        'coupling_strength': coupling,
+    }
+
+
+def intervention_ids(model):
+    """ {reaction id, gene id or gene name: reaction or gene id} of the model. """
+    ids = {g.name: g.id for g in model.genes if g.name}
+    ids.update((g.id, g.id) for g in model.genes)
+    ids.update((r.id, r.id) for r in model.reactions)
+    return ids
+
+
+def _regulatory(key, value):
+    # postprocess_reg_sd marks regulatory interventions, keyed by their constraint, with True or False
+    return isinstance(value, bool) or any(op in key for op in '<>=')
+
+
+def design_ids(design, ids):
+    """ The design with reaction and gene ids as keys, regulatory interventions are kept as they are. """
+    unknown = [k for k, v in design.items() if k not in ids and not _regulatory(k, v)]
+    if unknown:
+        raise Exception(f'Interventions {unknown} are neither reactions nor genes of the model.')
+    return {ids.get(k, k): v for k, v in design.items()}
+
+
+def _evaluate_chunk(chunk):
+    biomass, product, growth_tolerance, gpr = _worker['settings']
+    return [
+        (i, evaluate_design(_worker['model'], design, biomass, product, growth_tolerance, gpr))
+        for i, design in chunk
+    ]
+
+
+def validate_designs(model, designs, biomass='BIOMASS__1', product='EX_sucr_e', processes=None,
+                     chunk_size=default_chunk_size, growth_tolerance=1e-6):
+    """
+    Evaluate and rank strain designs.
+
+    Parameters
+    ----------
+    model : cobra.Model
+        The model the designs were computed for, with the medium of the design problem.
+    designs : SDSolutions, FactoredDesigns or list of dict
+        Strain designs of reaction and / or gene interventions, genes by id or by name. Regulatory interventions are
+        ignored, any other key that is not in the model raises.
+    biomass, product : str
+        Reaction ids of growth and of the target product.
+    processes : int, optional
+        Number of worker processes. If None, the designs are evaluated in this process.
+    chunk_size : int
+        Designs per task.
+    growth_tolerance : float
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per design, ranked by minimal product flux at maximal growth, then by maximal growth and the number
+        of interventions.
+    """
+    designs = list(getattr(designs, 'reaction_sd', designs))
+    ids = intervention_ids(model)
+    keyed = [design_ids(design, ids) for design in designs]
+    # neighbouring designs share most of their knockouts, so the solver basis of one is a good start for the next
+    order = sorted(range(len(keyed)), key=lambda i: sorted(k for k, v in keyed[i].items() if v != 0))
+    chunks = [
+        [(i, keyed[i]) for i in order[start:start + chunk_size]] for start in range(0, len(order), chunk_size)
+    ]
+    log.info(f'Validating {len(designs)} strain designs in {len(chunks)} chunks.')
+    genes = {g.id for g in model.genes}
+    gpr = compile_gpr(model) if any(k in genes for design in keyed for k in design) else None
+    results = {}
+    initargs = (model, biomass, product, growth_tolerance, gpr)
+    if processes is None:
+        _worker_init(*initargs)
+        for evaluated in map(_evaluate_chunk, chunks):
+            results.update(evaluated)
+    else:
+        with SDPool(processes, initializer=_worker_init, initargs=initargs) as pool:
+            for evaluated in pool.imap_unordered(_evaluate_chunk, chunks):
+                results.update(evaluated)
+    table = pd.DataFrame([results[i] for i in range(len(designs))])
+    table.insert(0, 'design', designs)
+    table = table.sort_values(
+        ['min_product', 'max_growth', 'interventions'], ascending=[False, False, True], na_position='last'
+    )
+    return table.reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    import sys
+    from syn_elong.benchmarks.sucrose_setup import sucrose_problem
+    from syn_elong.strain_design_simplified import StrainDesign
+
+    logging.basicConfig(level=logging.INFO)
+    consistent_model, modules, rxn_cost = sucrose_problem()
+    sd_helper = StrainDesign(consistent_model, sd_modules=[modules['optcouple']], ko_cost=rxn_cost)
+    sols = sd_helper.run(max_solutions=10, max_cost=5, time_limit=600)
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    print(validate_designs(consistent_model, sols, processes=processes).to_string())